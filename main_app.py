@@ -4,7 +4,7 @@ import streamlit.components.v1 as st_components
 import pandas as pd
 import json
 import os
-import tempfile
+import hashlib
 import plotly.graph_objects as go
 from datetime import datetime
 from typing import Dict, Any
@@ -16,6 +16,7 @@ import time
 try:
     from modules import parser, similarity, jd_handler
     from modules.resume_ranker import ResumeRanker
+    from modules.skill_matcher import skill_matcher, filter_bitsets
     
     # Use the enhanced suggestions system as the single source
     from modules.working_suggestions import get_enhanced_suggestions
@@ -339,10 +340,18 @@ footer {
 def load_components():
     """Load and cache application components"""
     try:
+        matcher = similarity.ResumeMatcher(method="hybrid")
+        ranker = ResumeRanker()
+        # Precomputed predefined-JD artifacts; rebuilt if the JSON has changed
+        bundle = jd_handler.load_jd_bundle("data/predefined_jds.json", matcher=matcher)
+        if bundle is not None:
+            matcher.attach_bundle(bundle)
+            ranker.matcher.attach_bundle(bundle)
         return {
-            'matcher': similarity.ResumeMatcher(method="hybrid"),
-            'ranker': ResumeRanker(),
-            'jds': jd_handler.load_predefined_jds("data/predefined_jds.json")
+            'matcher': matcher,
+            'ranker': ranker,
+            'jds': jd_handler.load_predefined_jds("data/predefined_jds.json"),
+            'jd_bundle': bundle
         }       
     except Exception as e:
         st.error(f"Error loading components: {e}")
@@ -859,7 +868,7 @@ def enhanced_ranking_display(df: pd.DataFrame, components: Dict, jd_text: str):
     
     # MUTUALLY EXCLUSIVE: Show either Reports or Export options, not both
     if st.session_state.get('show_reports', False):
-        generate_reports(df, jd_text)
+        generate_reports(df, jd_text, jd_keywords_for(components, jd_text), components['matcher'])
         
     if st.session_state.get('show_export', False):
         show_export_options(df)
@@ -953,6 +962,24 @@ def enhanced_ranking_display(df: pd.DataFrame, components: Dict, jd_text: str):
     # Drop the index entirely
     display_df = display_df.reset_index(drop=True)
 
+    # Skill facet: keep candidates having every selected skill (bitset match)
+    if 'Skills' in display_df.columns:
+        skill_lists = [[s for s in str(v).split(", ") if s] for v in display_df['Skills'].fillna("")]
+        present = sorted({s for skills in skill_lists for s in skills})
+        selected_skills = st.multiselect(
+            "🎯 Must-have skills",
+            options=present,
+            key="skill_facet",
+            help="Show only candidates whose resumes mention all selected skills"
+        )
+        if selected_skills:
+            keep = filter_bitsets(
+                skill_matcher.bitset_matrix(skill_lists),
+                required=skill_matcher.bitset(selected_skills)
+            )
+            display_df = display_df[keep].reset_index(drop=True)
+            st.caption(f"{len(display_df)} of {len(df)} candidates have all selected skills")
+
     # Apply styling
     styled_df = display_df.style.applymap(highlight_scores, subset=['Score (%)'])
 
@@ -1049,7 +1076,7 @@ def enhanced_ranking_display(df: pd.DataFrame, components: Dict, jd_text: str):
             else:
                 # Show placeholder message when no resume is selected
                 st.info("Select a resume from the dropdown above to view its preview")
-def generate_reports(df: pd.DataFrame, jd_text: str):
+def generate_reports(df: pd.DataFrame, jd_text: str, jd_keywords=None, matcher=None):
     """Generate detailed analysis reports with better formatting"""
     
     progress_steps = [
@@ -1070,7 +1097,7 @@ def generate_reports(df: pd.DataFrame, jd_text: str):
             for _, candidate in df.head(5).iterrows():  # Analyze top 5
                 if candidate['Filename'] in st.session_state.resume_previews:
                     resume_data = st.session_state.resume_previews[candidate['Filename']]
-                    suggestions = get_enhanced_suggestions(resume_data, jd_text)
+                    suggestions = get_enhanced_suggestions(resume_data, jd_text, jd_keywords, matcher)
                     detailed_analysis[candidate['Name']] = {
                         'suggestions': suggestions,
                         'score': candidate['Score (%)'],
@@ -1430,7 +1457,10 @@ def evaluation_tab(components: Dict):
                     
                     elif i == 3:
                         # Generate enhanced suggestions - FIXED VERSION
-                        suggestion_results = get_enhanced_suggestions(resume_data, jd_text)
+                        suggestion_results = get_enhanced_suggestions(
+                            resume_data, jd_text, jd_keywords_for(components, jd_text),
+                            components['matcher']
+                        )
                         st.session_state.current_suggestions = suggestion_results
                         st.session_state.current_resume_data = resume_data
 
@@ -1459,6 +1489,27 @@ def evaluation_tab(components: Dict):
                 st.error(f"❌ An error occurred during analysis: {str(e)}")
                 st.write("Please try uploading a different file or contact support if the issue persists.")
 
+    # Best-fit roles: one pass over the whole predefined JD library
+    if components.get('jd_bundle') is not None:
+        st.markdown("---")
+        st.subheader("🧭 Best-Fit Roles")
+        if st.button("🔎 Match Against All Roles", disabled=not uploaded_file):
+            resume_data = process_resume_upload(uploaded_file, "eval")
+            if not resume_data:
+                st.error("❌ Failed to process resume. Please check the file format.")
+            else:
+                with st.spinner("Scoring your resume against every role..."):
+                    role_scores = components['matcher'].match_all_roles(resume_data, top_k=10)
+                if role_scores:
+                    roles_df = pd.DataFrame(
+                        [(role, round(score * 100, 2)) for role, score in role_scores],
+                        columns=["Role", "Match (%)"]
+                    )
+                    roles_df.index += 1
+                    st.dataframe(roles_df, use_container_width=True)
+                else:
+                    st.warning("⚠️ Could not score this resume against the role library.")
+
 def ranking_tab(components: Dict):
     """Enhanced multiple resume ranking interface"""
     
@@ -1538,51 +1589,52 @@ def ranking_tab(components: Dict):
                 "🎯 Preparing detailed results."
             ]
             progress_placeholder = st.empty()
+            live_placeholder = st.empty()
 
             try:
-                file_paths = []
                 resume_previews = {}
 
-                # Keep tempdir alive until after ranking
-                with tempfile.TemporaryDirectory() as tmp_dir:
-                    for i, step in enumerate(progress_steps):
-                        progress_placeholder.markdown(show_progress_indicator(progress_steps, i), unsafe_allow_html=True)
-
-                        if i == 1:  # During file processing
-                            file_progress = st.progress(0)
-                            for idx, file in enumerate(uploaded_files):
-                                # make a unique safe filename to avoid collisions
-                                safe_name = file.name
-                                path = os.path.join(tmp_dir, safe_name)
-                                with open(path, "wb") as f:
-                                    f.write(file.getbuffer())
-                                file_paths.append(path)
-                                # store the original uploaded bytes for previewing the real file later
-                                try:
-                                    file_bytes = file.getbuffer().tobytes()  # raw bytes
-                                except Exception:
-                                    # fallback if getbuffer isn't available
-                                    file.seek(0)
-                                    file_bytes = file.read()
-                                st.session_state['uploaded_files_store'][file.name] = file_bytes
-                                # Parse once for preview (best-effort) and store by basename
-                                try:
-                                    file.seek(0)
-                                    parsed = parser.parse_resume(file)
-                                    resume_previews[file.name] = parsed
-                                except Exception:
-                                    resume_previews[file.name] = {}
-
-                                file_progress.progress((idx + 1) / len(uploaded_files))
-                            file_progress.empty()
-
-
-                        # small UX pause
-                        time.sleep(0.3)
-
-                    # Rank while files still exist
-                    df = components['ranker'].process_batch(file_paths, jd_text)
+                progress_placeholder.markdown(show_progress_indicator(progress_steps, 0), unsafe_allow_html=True)
+                for file in uploaded_files:
+                    # Keep a reference to the uploaded bytes for previewing the real file later
+                    # (getvalue() shares the upload's buffer instead of copying it)
+                    st.session_state['uploaded_files_store'][file.name] = file.getvalue()
+
+                # Parse each file exactly once; the same records feed the preview and the ranking
+                def parsed_batches(batch_size=16):
+                    for start in range(0, len(uploaded_files), batch_size):
+                        batch_files = uploaded_files[start:start + batch_size]
+                        try:
+                            parsed_files = parser.parse_resumes(batch_files)
+                        except Exception:
+                            parsed_files = [{}] * len(batch_files)
+                        for file, parsed in zip(batch_files, parsed_files):
+                            resume_previews[file.name] = parsed or {}
+                        yield parsed_files
+
+                progress_placeholder.markdown(show_progress_indicator(progress_steps, 1), unsafe_allow_html=True)
+                rank_progress = st.progress(0)
+                results = []
+                for update in components['ranker'].iter_rank_parsed(
+                    parsed_batches(), jd_text, total=len(uploaded_files), top_k=10
+                ):
+                    progress_placeholder.markdown(show_progress_indicator(progress_steps, 2), unsafe_allow_html=True)
+                    results = update["results"]
+                    rank_progress.progress(
+                        update["processed"] / update["total"],
+                        text=f"Scored {update['processed']} of {update['total']} resumes"
+                    )
+                    if update["new"]:
+                        live_placeholder.dataframe(
+                            pd.DataFrame(update["top"]),
+                            use_container_width=True,
+                            hide_index=True
+                        )
+                rank_progress.empty()
+                live_placeholder.empty()
 
+                progress_placeholder.markdown(show_progress_indicator(progress_steps, 4), unsafe_allow_html=True)
+                df = components['ranker'].to_frame(results)
                 progress_placeholder.empty()
 
                 # Optional: threshold filter
@@ -1693,11 +1745,18 @@ def get_jd_input_enhanced(jds: Dict[str, str], tab_prefix: str) -> str:
     
     return jd_text
 
+def jd_keywords_for(components: Dict, jd_text: str):
+    """Precomputed suggestion keywords for a predefined JD, or None"""
+    bundle = components.get('jd_bundle')
+    if bundle is None:
+        return None
+    return bundle.keywords_for(similarity.ResumeMatcher.jd_key(jd_text))
+
 def process_resume_upload(uploaded_file, mode: str) -> Dict:
     """Enhanced resume processing with better error handling"""
     
-    # Create a more specific cache key
-    file_hash = hash(uploaded_file.getvalue())
+    # Create a more specific cache key (stable across processes, unlike hash())
+    file_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
     cache_key = f"{mode}_{uploaded_file.name}_{file_hash}"
     
     if cache_key not in st.session_state.processed_resumes:
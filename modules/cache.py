@@ -0,0 +1,96 @@
+import os
+import time
+import zlib
+import pickle
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Optional
+
+# Root directory for all on-disk caches; override with RESUME_CACHE_DIR
+CACHE_DIR = os.environ.get("RESUME_CACHE_DIR", ".cache")
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of raw file bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParseCache:
+    """
+    Content-addressed, size-bounded cache of parser results stored in SQLite.
+    Values are pickled and zlib-compressed; the least recently used entries
+    are evicted once the total payload exceeds max_bytes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path or os.path.join(CACHE_DIR, "parse_cache.sqlite")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path,
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    (time.time(), key)
+                )
+            return pickle.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            print(f"Parse cache read error: {e}")
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        try:
+            blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time())
+                )
+                self._evict()
+        except Exception as e:
+            print(f"Parse cache write error: {e}")
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        stale = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
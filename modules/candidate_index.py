@@ -0,0 +1,516 @@
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from modules.cache import CACHE_DIR, content_hash
+from modules.similarity import ResumeMatcher
+
+INDEX_VERSION = 1
+COMPACT_DTYPES = ("float32", "float16", "int8")
+# Rows dequantized per block when scoring int8 codes
+_SCORE_BLOCK = 65536
+
+
+def quantize_int8(vectors: np.ndarray, scales: Optional[np.ndarray] = None):
+    """
+    Per-dimension symmetric int8 quantization: code = round(x / scale) with
+    scale = max |x| of that dimension / 127. Returns (codes, scales).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if scales is None:
+        scales = np.maximum(np.abs(vectors).max(axis=0), 1e-8) / 127.0
+    codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class CandidateIndex:
+    """
+    Persistent pool of past applicants that new JDs can be queried against
+    without re-uploading or re-parsing anything.
+
+    Columnar, append-only files in one directory, all read through np.memmap:
+        meta.jsonl              one JSON metadata record per candidate
+        tf_data / tf_indices /  CSR rows of hashed term counts; IDF is derived
+        tf_indptr               from document frequencies kept up to date on
+                                add, so rows never need refitting as the pool grows
+        embeddings              (n, dim) float32 document embeddings
+        embeddings.float16 /    optional compact copy searched instead of the
+        embeddings.int8         float32 file (see embedding_dtype)
+        ivf_*.npy               optional coarse partitioning (see build_ivf)
+
+    With embedding_dtype "float16" or "int8" (per-dimension scaled), queries
+    scan the 2x/4x smaller compact matrix and then rescore the best
+    top_k * rescore candidates with their float32 vectors, which are read
+    from disk only for those rows.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        matcher: Optional[ResumeMatcher] = None,
+        n_features: int = 2 ** 18,
+        embedding_dtype: Optional[str] = None,
+        rescore: int = 4
+    ):
+        if embedding_dtype not in (None,) + COMPACT_DTYPES:
+            raise ValueError(f"embedding_dtype must be one of {COMPACT_DTYPES}")
+        self.directory = directory or os.path.join(CACHE_DIR, "candidates")
+        os.makedirs(self.directory, exist_ok=True)
+        self.matcher = matcher or ResumeMatcher(method="tfidf")
+        self._lock = threading.Lock()
+
+        use_embeddings = self.matcher.method in ('hybrid', 'embedding')
+        config = {
+            "version": INDEX_VERSION,
+            "n_features": n_features,
+            "ngram_range": list(getattr(self.matcher, "tfidf_params", {}).get("ngram_range", (1, 2))),
+            "embedding_model": self.matcher.embedding_signature if use_embeddings else None,
+            "dim": self.matcher.embedding_model.get_sentence_embedding_dimension() if use_embeddings else 0,
+            "embedding_dtype": embedding_dtype or "float32"
+        }
+        config_path = self._path("index.json")
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("version") != INDEX_VERSION:
+                raise ValueError(f"Candidate index at {self.directory} is version {stored.get('version')}")
+            if use_embeddings and stored["embedding_model"] not in (None, config["embedding_model"]):
+                raise ValueError(
+                    f"Candidate index was built with {stored['embedding_model']}, "
+                    f"not {config['embedding_model']}"
+                )
+            # Keep the stored layout; a TF-IDF-only matcher can still query
+            # (but not extend) an index that holds embeddings
+            config = stored
+        self.config = config
+        config["embedding_dtype"] = embedding_dtype or config.get("embedding_dtype", "float32")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        self.embedding_dtype = config["embedding_dtype"]
+        self.rescore = rescore
+        self.dim = config["dim"]
+        self.use_embeddings = use_embeddings and self.dim > 0
+        self.writable = self.dim == 0 or self.use_embeddings
+
+        self.vectorizer = HashingVectorizer(
+            n_features=config["n_features"],
+            ngram_range=tuple(config["ngram_range"]),
+            stop_words="english",
+            alternate_sign=False,
+            norm=None
+        )
+
+        self.metadata, self._meta_bytes = self._read_metadata()
+        self._ids = {meta["id"]: row for row, meta in enumerate(self.metadata)}
+        self._maps = {}
+        self._scales = None
+        self._recover()
+
+        self._df = None
+        self._idf_cache = None
+        self._columns = {}
+        self._list_fields = set()
+        self._load_ivf()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def _read_metadata(self):
+        """
+        Records from the complete metadata lines, and the byte length of
+        those lines; a partial last line from an interrupted add is left out.
+        """
+        path = self._path("meta.jsonl")
+        if not os.path.exists(path):
+            return [], 0
+        with open(path, "rb") as f:
+            lines = f.read().split(b"\n")[:-1]  # the last piece has no newline yet
+        metadata, size = [], 0
+        for line in lines:
+            if line.strip():
+                try:
+                    metadata.append(json.loads(line))
+                except ValueError:
+                    break
+            size += len(line) + 1
+        return metadata, size
+
+    def _file_rows(self, name: str, dtype, width: int = 1) -> int:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // (np.dtype(dtype).itemsize * width)
+
+    def _recover(self) -> None:
+        """
+        Metadata is written last, so it defines how many candidates are
+        complete; truncate any array tails left by an interrupted add.
+        """
+        indptr_rows = self._file_rows("tf_indptr", np.int64)
+        n = min(len(self.metadata), max(0, indptr_rows - 1))
+        if self.dim:
+            n = min(n, self._file_rows("embeddings", np.float32, self.dim))
+        if n != len(self.metadata):
+            self.metadata = self.metadata[:n]
+            self._ids = {meta["id"]: row for row, meta in enumerate(self.metadata)}
+            with open(self._path("meta.jsonl"), "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(meta) + "\n" for meta in self.metadata)
+        elif os.path.exists(self._path("meta.jsonl")):
+            # Drop a partial last line, so the next add starts on a fresh one
+            with open(self._path("meta.jsonl"), "ab") as f:
+                f.truncate(self._meta_bytes)
+
+        if n == 0:
+            nnz = 0
+            with open(self._path("tf_indptr"), "wb") as f:
+                f.write(np.zeros(1, dtype=np.int64).tobytes())
+        else:
+            nnz = int(np.memmap(self._path("tf_indptr"), dtype=np.int64, mode="r")[n])
+            with open(self._path("tf_indptr"), "ab") as f:
+                f.truncate((n + 1) * 8)
+        for name, itemsize in (("tf_data", 4), ("tf_indices", 4)):
+            with open(self._path(name), "ab") as f:
+                f.truncate(nnz * itemsize)
+        if self.dim:
+            with open(self._path("embeddings"), "ab") as f:
+                f.truncate(n * self.dim * 4)
+        self._nnz = nnz
+
+        if self.dim and self.embedding_dtype != "float32":
+            compact = self._compact_name()
+            itemsize = np.dtype(self.embedding_dtype).itemsize
+            # The compact copy is derived from the float32 file; rebuild it if short
+            scales_ok = self.embedding_dtype != "int8" or n == 0 or os.path.exists(self._path(f"{compact}.scales.npy"))
+            if self._file_rows(compact, self.embedding_dtype, self.dim) < n or not scales_ok:
+                self._build_compact()
+            else:
+                with open(self._path(compact), "ab") as f:
+                    f.truncate(n * self.dim * itemsize)
+                if self.embedding_dtype == "int8" and n:
+                    self._scales = np.load(self._path(f"{compact}.scales.npy"))
+
+    def _compact_name(self) -> str:
+        return f"embeddings.{self.embedding_dtype}"
+
+    def _encode_compact(self, vectors: np.ndarray) -> np.ndarray:
+        if self.embedding_dtype == "int8":
+            return quantize_int8(vectors, self._scales)[0]
+        return np.asarray(vectors, dtype=self.embedding_dtype)
+
+    def _build_compact(self) -> None:
+        """(Re)write the compact copy of every stored embedding from the float32 file"""
+        if self.embedding_dtype == "float32":
+            return
+        n = self._file_rows("embeddings", np.float32, self.dim)
+        full = np.memmap(self._path("embeddings"), dtype=np.float32, mode="r", shape=(n, self.dim)) if n else np.zeros((0, self.dim), np.float32)
+        if self.embedding_dtype == "int8":
+            self._scales = None
+            if n:
+                self._scales = quantize_int8(full)[1]
+                np.save(self._path(f"{self._compact_name()}.scales.npy"), self._scales)
+        with open(self._path(self._compact_name()), "wb") as f:
+            for start in range(0, n, _SCORE_BLOCK):
+                f.write(self._encode_compact(full[start:start + _SCORE_BLOCK]).tobytes())
+        self._maps.pop(self._compact_name(), None)
+
+    def _memmap(self, name: str, dtype, shape):
+        current = self._maps.get(name)
+        if current is None or current.shape != shape:
+            current = np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape)
+            self._maps[name] = current
+        return current
+
+    def _tf_matrix(self) -> sparse.csr_matrix:
+        n = len(self.metadata)
+        if n == 0 or self._nnz == 0:
+            return sparse.csr_matrix((n, self.config["n_features"]), dtype=np.float32)
+        return sparse.csr_matrix(
+            (
+                self._memmap("tf_data", np.float32, (self._nnz,)),
+                self._memmap("tf_indices", np.int32, (self._nnz,)),
+                self._memmap("tf_indptr", np.int64, (n + 1,))
+            ),
+            shape=(n, self.config["n_features"])
+        )
+
+    def _embeddings(self) -> np.ndarray:
+        return self._memmap("embeddings", np.float32, (len(self.metadata), self.dim))
+
+    def _semantic_scores(self, rows: np.ndarray, jd_embedding: np.ndarray, exact: bool = False) -> np.ndarray:
+        """Embedding similarity for rows, from the compact matrix unless exact"""
+        n = len(self.metadata)
+        if exact or self.embedding_dtype == "float32":
+            embeddings = self._embeddings()
+            return (embeddings if len(rows) == n else embeddings[rows]) @ jd_embedding
+
+        codes = self._memmap(self._compact_name(), self.embedding_dtype, (n, self.dim))
+        query = jd_embedding * self._scales if self.embedding_dtype == "int8" else jd_embedding
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), _SCORE_BLOCK):
+            block = rows[start:start + _SCORE_BLOCK]
+            chunk = codes[block[0]:block[-1] + 1] if len(rows) == n else codes[block]
+            scores[start:start + len(block)] = chunk.astype(np.float32) @ query
+        return scores
+
+    def add(self, records: List[dict]) -> int:
+        """
+        Add ranking records (name/email/phone/filename/text, as produced by
+        ResumeRanker) to the pool. Resumes already indexed, by text hash, are
+        skipped. Returns the number of candidates added.
+        """
+        if not self.writable:
+            raise ValueError("This index stores embeddings; add through a matcher with its embedding model")
+        with self._lock:
+            known = set(self._ids)
+        fresh, seen = [], set()
+        for record in records:
+            text = (record or {}).get("text")
+            if not text:
+                continue
+            key = content_hash(text.encode("utf-8"))
+            if key in known or key in seen:
+                continue
+            seen.add(key)
+            fresh.append((key, record))
+        if not fresh:
+            return 0
+
+        # Vectorize and encode without the lock so queries keep running
+        texts = [self.matcher.clean_text(record["text"]) for _, record in fresh]
+        rows = self.vectorizer.transform(texts).tocsr()
+        rows.sort_indices()
+        embeddings = self.matcher._embed_documents(texts) if self.use_embeddings else None
+
+        with self._lock:
+            # Drop anything a concurrent add stored meanwhile
+            keep = [i for i, (key, _) in enumerate(fresh) if key not in self._ids]
+            if not keep:
+                return 0
+            if len(keep) < len(fresh):
+                fresh = [fresh[i] for i in keep]
+                rows = rows[keep]
+                embeddings = None if embeddings is None else embeddings[keep]
+
+            added = datetime.now().isoformat()
+            metadata = [
+                {
+                    "id": key,
+                    "name": record.get("name"),
+                    "email": record.get("email"),
+                    "phone": record.get("phone"),
+                    "filename": record.get("filename"),
+                    "skills": record.get("skills", []),
+                    "added": added
+                }
+                for key, record in fresh
+            ]
+
+            # Arrays first, metadata last: _recover trims anything past the
+            # last complete metadata line
+            with open(self._path("tf_data"), "ab") as f:
+                f.write(rows.data.astype(np.float32).tobytes())
+            with open(self._path("tf_indices"), "ab") as f:
+                f.write(rows.indices.astype(np.int32).tobytes())
+            with open(self._path("tf_indptr"), "ab") as f:
+                f.write((rows.indptr[1:].astype(np.int64) + self._nnz).tobytes())
+            if embeddings is not None:
+                with open(self._path("embeddings"), "ab") as f:
+                    f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+                if self.embedding_dtype == "int8" and (
+                    self._scales is None or np.any(np.abs(embeddings) > self._scales * 127.0)
+                ):
+                    # First vectors, or values outside the current ranges: requantize everything
+                    self._build_compact()
+                elif self.embedding_dtype != "float32":
+                    with open(self._path(self._compact_name()), "ab") as f:
+                        f.write(self._encode_compact(embeddings).tobytes())
+            with open(self._path("meta.jsonl"), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(meta) + "\n" for meta in metadata)
+
+            start = len(self.metadata)
+            self.metadata.extend(metadata)
+            for offset, meta in enumerate(metadata):
+                self._ids[meta["id"]] = start + offset
+            self._nnz += rows.nnz
+            if self._df is not None:
+                self._df += np.bincount(rows.indices, minlength=self.config["n_features"])
+            self._idf_cache = None
+            for field, column in self._columns.items():
+                self._columns[field] = np.concatenate([column, self._column_values(metadata, field)])
+                self._note_list_field(field, metadata)
+            return len(metadata)
+
+    def _idf(self) -> np.ndarray:
+        """
+        Smoothed IDF over the current pool. Document frequencies are counted
+        once and then updated by add, so this never rescans the matrix.
+        """
+        n = len(self.metadata)
+        if self._df is None:
+            self._df = np.bincount(self._tf_matrix().indices, minlength=self.config["n_features"])
+        if self._idf_cache is None or self._idf_cache[0] != n:
+            self._idf_cache = (n, (np.log((1 + n) / (1 + self._df)) + 1).astype(np.float32))
+        return self._idf_cache[1]
+
+    @staticmethod
+    def _column_values(metadata: List[dict], field: str) -> np.ndarray:
+        column = np.empty(len(metadata), dtype=object)
+        # Lists (e.g. skills) become tuples so they can be hashed and compared
+        column[:] = [tuple(v) if isinstance(v, list) else v for v in (meta.get(field) for meta in metadata)]
+        return column
+
+    def _column(self, field: str) -> np.ndarray:
+        """One metadata field for every candidate, built on first use and extended by add"""
+        if field not in self._columns:
+            self._columns[field] = self._column_values(self.metadata, field)
+            self._note_list_field(field, self.metadata)
+        return self._columns[field]
+
+    def _note_list_field(self, field: str, metadata: List[dict]) -> None:
+        if field not in self._list_fields and any(isinstance(meta.get(field), list) for meta in metadata):
+            self._list_fields.add(field)
+
+    def _filter_rows(self, rows: np.ndarray, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """
+        Keep rows whose metadata passes every filter. A filter value may be a
+        predicate (called once per candidate value), a collection of allowed
+        values, or a value to match exactly; the latter two are hashed lookups
+        over a metadata column. List fields such as skills pass when they
+        contain any of the wanted values, so {"skills": "Python"} keeps every
+        candidate with Python among their skills.
+        """
+        for field, wanted in (filters or {}).items():
+            if len(rows) == 0:
+                break
+            values = self._column(field)[rows]
+            if callable(wanted):
+                mask = np.fromiter(map(bool, map(wanted, values)), dtype=bool, count=len(values))
+            else:
+                if not isinstance(wanted, (list, tuple, set, frozenset)):
+                    wanted = [wanted]
+                values = pd.Series(values)
+                if field in self._list_fields:
+                    # One entry per list item, then any match per candidate
+                    mask = values.explode().isin(list(wanted)).groupby(level=0).any().to_numpy()
+                else:
+                    mask = values.isin(list(wanted)).to_numpy()
+            rows = rows[mask]
+        return rows
+
+    def query(
+        self,
+        jd_text: str,
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        n_probe: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Best-matching candidates for a JD: metadata records with a "score"
+        (0-1), best first. Scores blend embedding and TF-IDF similarity like
+        the hybrid ResumeMatcher. With an IVF layer built, n_probe limits the
+        scan to the candidates in the n_probe closest partitions.
+        """
+        if not jd_text or top_k <= 0:
+            return []
+        # Encode the JD before taking the lock, so adds and other queries aren't blocked on it
+        clean_jd = self.matcher.clean_text(jd_text)
+        jd_terms = self.vectorizer.transform([clean_jd]).tocsr()
+        jd_embedding = self.matcher._embed_documents([clean_jd])[0] if self.use_embeddings else None
+
+        with self._lock:
+            n = len(self.metadata)
+            if n == 0:
+                return []
+
+            rows = np.arange(n)
+            if n_probe is not None and self._ivf is not None and jd_embedding is not None:
+                rows = self._probe(jd_embedding, n_probe, n)
+            rows = self._filter_rows(rows, filters)
+            if len(rows) == 0:
+                return []
+
+            matrix = self._tf_matrix()
+            idf = self._idf()
+            query = normalize(jd_terms.multiply(idf).tocsr())
+            # Only the scanned rows are touched: with IVF this stays sublinear
+            subset = matrix if len(rows) == n else matrix[rows]
+            norms = np.sqrt(subset.power(2) @ (idf ** 2))
+            tfidf = np.asarray((subset @ query.multiply(idf).T).todense()).ravel()
+            tfidf = tfidf / np.maximum(norms, 1e-12)
+
+            tfidf = np.round(tfidf, 4)
+            if jd_embedding is not None:
+                scores = 0.6 * self._semantic_scores(rows, jd_embedding) + 0.4 * tfidf
+            else:
+                scores = tfidf
+
+            k = min(top_k, len(rows))
+            if jd_embedding is not None and self.embedding_dtype != "float32" and self.rescore:
+                # Exact pass over a shortlist from the compact scores
+                m = min(len(rows), k * self.rescore)
+                shortlist = np.sort(np.argpartition(-scores, m - 1)[:m])
+                scores[shortlist] = (
+                    0.6 * self._semantic_scores(rows[shortlist], jd_embedding, exact=True)
+                    + 0.4 * tfidf[shortlist]
+                )
+                best = shortlist[np.argpartition(-scores[shortlist], k - 1)[:k]]
+            else:
+                best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [
+                {**self.metadata[rows[i]], "score": float(round(scores[i], 4))}
+                for i in best
+            ]
+
+    def build_ivf(self, n_lists: Optional[int] = None, seed: int = 0) -> None:
+        """
+        Partition the pool's embeddings with k-means (default ~sqrt(n) lists)
+        so queries with n_probe scan only the closest partitions. Candidates
+        added later are always scanned until the layer is rebuilt.
+        """
+        from sklearn.cluster import MiniBatchKMeans
+
+        with self._lock:
+            if not self.use_embeddings:
+                raise ValueError("IVF partitioning needs an index with embeddings")
+            n = len(self.metadata)
+            if n == 0:
+                return
+            n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+            kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=seed, n_init=3)
+            assignments = kmeans.fit_predict(np.asarray(self._embeddings()))
+            centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+            order = np.argsort(assignments, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1)).astype(np.int64)
+
+            np.save(self._path("ivf_centroids.npy"), centroids)
+            np.save(self._path("ivf_order.npy"), order)
+            np.save(self._path("ivf_offsets.npy"), offsets)
+            self._load_ivf()
+
+    def _load_ivf(self) -> None:
+        self._ivf = None
+        if all(os.path.exists(self._path(f"ivf_{name}.npy")) for name in ("centroids", "order", "offsets")):
+            self._ivf = tuple(
+                np.load(self._path(f"ivf_{name}.npy"), mmap_mode="r")
+                for name in ("centroids", "order", "offsets")
+            )
+
+    def _probe(self, jd_embedding: np.ndarray, n_probe: int, n: int) -> np.ndarray:
+        centroids, order, offsets = self._ivf
+        n_probe = max(1, min(n_probe, len(centroids)))
+        lists = np.argpartition(-(centroids @ jd_embedding), n_probe - 1)[:n_probe]
+        covered = len(order)
+        rows = [order[offsets[i]:offsets[i + 1]] for i in lists]
+        # Rows added after the partitioning was built are not in any list
+        rows.append(np.arange(covered, n))
+        return np.sort(np.concatenate(rows))
@@ -0,0 +1,157 @@
+import os
+import re
+import hashlib
+import threading
+import numpy as np
+from contextlib import contextmanager
+from typing import List, Optional
+from modules.cache import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: stores are then only shared between threads
+    fcntl = None
+
+# One lock per store file, shared by every EmbeddingStore opened on it
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk store of normalized embeddings for one encoder model.
+
+    Vectors are written to a raw float32/float16 file and read back through
+    np.memmap, so lookups don't load the whole store into RAM. A sidecar
+    index holds the text hash of each row, one per line.
+
+    Threads share a lock per file; processes (worker pools, other app
+    sessions) coordinate through an OS lock on a sidecar .lock file. Appends
+    and repairs hold it exclusively, and each instance re-reads the index
+    under it, so rows appended elsewhere are picked up rather than overwritten.
+    """
+
+    def __init__(self, model_name: str, dim: int, directory: Optional[str] = None, dtype: str = "float32"):
+        if dtype not in ("float32", "float16"):
+            raise ValueError("dtype must be 'float32' or 'float16'")
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._row_bytes = self.dim * self.dtype.itemsize
+        self._mmap = None
+
+        directory = directory or os.path.join(CACHE_DIR, "embeddings")
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, re.sub(r"[^\w.-]+", "_", model_name))
+        self.vectors_path = f"{base}.{dim}.{dtype}"
+        self.index_path = f"{base}.{dim}.{dtype}.idx"
+        self.lock_path = f"{base}.{dim}.{dtype}.lock"
+        with _file_locks_guard:
+            self._lock = _file_locks.setdefault(self.vectors_path, threading.Lock())
+
+        self._rows = {}
+        self._n_rows = 0
+        self._index_offset = 0
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._repair()
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _vector_rows(self) -> int:
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        return size // self._row_bytes
+
+    def _refresh(self) -> None:
+        """Read index lines appended since the last read. Caller holds the file lock."""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read()
+        available = self._vector_rows()
+        for line in data.split(b"\n")[:-1]:  # the last piece has no newline yet
+            if self._n_rows >= available:
+                break
+            self._rows.setdefault(line.strip().decode("ascii"), self._n_rows)
+            self._n_rows += 1
+            self._index_offset += len(line) + 1
+
+    def _repair(self) -> None:
+        """
+        Drop a half-written tail (vectors without index lines, or a partial
+        index line) left by a crashed writer, so rows and index lines stay
+        aligned. Caller holds the file lock exclusively.
+        """
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) != self._n_rows * self._row_bytes:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(self._n_rows * self._row_bytes)
+        if os.path.exists(self.index_path) and os.path.getsize(self.index_path) != self._index_offset:
+            with open(self.index_path, "ab") as f:
+                f.truncate(self._index_offset)
+
+    def _matrix(self) -> np.ndarray:
+        if self._mmap is None or self._mmap.shape[0] < self._n_rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(self._n_rows, self.dim))
+        return self._mmap
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Stored vectors (as float32) for each key, or None where missing"""
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                # Another process may have stored them since the last read
+                with self._file_lock(exclusive=False):
+                    self._refresh()
+            rows = [self._rows.get(key) for key in keys]
+            hits = [row for row in rows if row is not None]
+            if not hits:
+                return [None] * len(keys)
+            matrix = self._matrix()
+        return [None if row is None else np.asarray(matrix[row], dtype=np.float32) for row in rows]
+
+    def add(self, keys: List[str], vectors: np.ndarray) -> None:
+        """Append vectors for keys not stored yet"""
+        vectors = np.asarray(vectors, dtype=self.dtype).reshape(-1, self.dim)
+        with self._lock, self._file_lock():
+            # Rows other instances appended since the last read come first
+            self._refresh()
+            self._repair()
+
+            new_keys, new_rows = [], []
+            for key, vector in zip(keys, vectors):
+                if key in self._rows or key in new_keys:
+                    continue
+                new_keys.append(key)
+                new_rows.append(vector)
+            if not new_keys:
+                return
+
+            # Vectors first, then index lines: a crash leaves at most an
+            # unindexed tail that the next writer truncates
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(np.stack(new_rows)).tobytes())
+            lines = "".join(f"{key}\n" for key in new_keys)
+            with open(self.index_path, "a", encoding="ascii") as f:
+                f.write(lines)
+
+            for offset, key in enumerate(new_keys):
+                self._rows[key] = self._n_rows + offset
+            self._n_rows += len(new_keys)
+            self._index_offset += len(lines)
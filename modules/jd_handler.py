@@ -1,8 +1,16 @@
+import os
 import json
-from typing import List, Dict
+import hashlib
+import numpy as np
+from typing import List, Dict, Optional, Set
 
 _jd_cache = None
 
+# Bump whenever the bundle layout or the JD-side preprocessing changes
+BUNDLE_VERSION = 2
+DEFAULT_JSON_PATH = "data/predefined_jds.json"
+DEFAULT_BUNDLE_DIR = "data/jd_bundle"
+
 def load_predefined_jds(json_path: str = "data/predefined_jds.json") -> Dict[str, str]:
     global _jd_cache
     if _jd_cache is not None:
@@ -23,3 +31,131 @@ def get_job_roles(json_path: str = "data/predefined_jds.json") -> List[str]:
 def get_description_for_role(role: str, json_path: str = "data/predefined_jds.json") -> str:
     jd_dict = load_predefined_jds(json_path)
     return jd_dict.get(role, "")
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class JDBundle:
+    """
+    Precomputed JD-side artifacts for the predefined roles: cleaned-text keys,
+    suggestion keywords and JD embeddings, memory-mapped rather than read into
+    RAM. There is no TF-IDF model: like a custom JD, a predefined JD's TF-IDF
+    is fitted on the JD plus the resumes being scored, so its scores are on
+    the same scale whichever way the JD was picked.
+    """
+
+    def __init__(self, directory: str, manifest: Dict):
+        self.directory = directory
+        self.manifest = manifest
+        self.roles = manifest["roles"]
+        self.keys = manifest["keys"]
+        self.texts = manifest["texts"]
+        self.embedding_model = manifest.get("embedding_model")
+        self._index = {key: i for i, key in enumerate(self.keys)}
+        self._keywords = [set(kws) for kws in manifest["keywords"]]
+
+        self.embeddings = None
+        if self.embedding_model:
+            self.embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+
+    def index_of(self, jd_key: str) -> Optional[int]:
+        return self._index.get(jd_key)
+
+    def keywords_for(self, jd_key: str) -> Optional[Set[str]]:
+        i = self.index_of(jd_key)
+        return None if i is None else set(self._keywords[i])
+
+
+def build_jd_bundle(
+    json_path: str = DEFAULT_JSON_PATH,
+    bundle_dir: str = DEFAULT_BUNDLE_DIR,
+    matcher=None
+) -> JDBundle:
+    """
+    Precompute JD cleaning, keyword extraction and JD embeddings for every
+    predefined role and write them as a versioned bundle.
+    """
+    from modules.similarity import ResumeMatcher
+    from modules.working_suggestions import extract_jd_keywords
+
+    if matcher is None:
+        matcher = ResumeMatcher(method="hybrid", embedding_cache=False)
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        jds = json.load(f)
+    roles = list(jds.keys())
+    raw_texts = [jds[role] for role in roles]
+    clean_texts = [ResumeMatcher.clean_text(t) for t in raw_texts]
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "json_sha256": _file_sha256(json_path),
+        "roles": roles,
+        "keys": [ResumeMatcher.jd_key(t) for t in raw_texts],
+        "texts": clean_texts,
+        "keywords": [sorted(extract_jd_keywords(t)) for t in raw_texts],
+        "embedding_model": None
+    }
+
+    if getattr(matcher, "method", None) in ("hybrid", "embedding"):
+        embeddings = matcher._embed_documents(clean_texts).astype(np.float32)
+        np.save(os.path.join(bundle_dir, "embeddings.npy"), embeddings)
+        manifest["embedding_model"] = matcher.embedding_signature
+
+    # Manifest last: a bundle without one is treated as missing
+    with open(os.path.join(bundle_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    return JDBundle(bundle_dir, manifest)
+
+
+def load_jd_bundle(
+    json_path: str = DEFAULT_JSON_PATH,
+    bundle_dir: str = DEFAULT_BUNDLE_DIR,
+    matcher=None
+) -> Optional[JDBundle]:
+    """
+    Memory-map the JD bundle. If it is missing, from an older version, built
+    from a different JSON (hash mismatch) or for a different embedding model,
+    it is rebuilt when a matcher is given; otherwise None is returned.
+    """
+    try:
+        manifest_path = os.path.join(bundle_dir, "manifest.json")
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+        stale = (
+            manifest is None
+            or manifest.get("version") != BUNDLE_VERSION
+            or manifest.get("json_sha256") != _file_sha256(json_path)
+        )
+        if not stale and matcher is not None and getattr(matcher, "method", None) in ("hybrid", "embedding"):
+            stale = manifest.get("embedding_model") != matcher.embedding_signature
+
+        if not stale:
+            return JDBundle(bundle_dir, manifest)
+        if matcher is None:
+            return None
+        return build_jd_bundle(json_path, bundle_dir, matcher)
+    except Exception as e:
+        print(f"Error loading JD bundle: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Predefined JD artifact bundle")
+    arg_parser.add_argument("command", choices=["build"])
+    arg_parser.add_argument("--json", default=DEFAULT_JSON_PATH)
+    arg_parser.add_argument("--out", default=DEFAULT_BUNDLE_DIR)
+    args = arg_parser.parse_args()
+
+    bundle = build_jd_bundle(args.json, args.out)
+    print(f"Built JD bundle for {len(bundle.roles)} roles in {args.out}")
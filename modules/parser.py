@@ -1,41 +1,181 @@
 import PyPDF2
 from docx import Document
 import re
+import io
 import unicodedata
 import os
 from datetime import datetime
-from transformers import pipeline
+from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
 from functools import lru_cache
 import torch
-from modules.text_constants import SKILL_KEYWORDS, SKILL_CATEGORIES, INSTITUTION_KEYWORDS
+from modules.text_constants import SKILL_KEYWORDS, INSTITUTION_KEYWORDS
+from modules.cache import ParseCache, content_hash
+from modules.skill_matcher import skill_matcher
+
+# Bump whenever extraction or parse_resume output changes so stale cache entries are ignored
+PARSER_VERSION = "5"
 
 class ResumeNER:
-    def __init__(self):
+    MODEL_NAME = "dslim/bert-base-NER"
+
+    def __init__(self, max_tokens: int = 510, overlap: int = 64, batch_size: int = 8, quantize=None):
+        """
+        Args:
+            max_tokens: Tokens per NER window (BERT allows 512 including [CLS]/[SEP])
+            overlap: Tokens shared by neighbouring windows so entities on a
+                boundary are always seen whole by one of them
+            batch_size: Windows per forward pass
+            quantize: Apply dynamic int8 quantization to the linear layers and
+                run on CPU. Defaults to the RESUME_NER_QUANTIZE environment variable.
+        """
+        if quantize is None:
+            quantize = os.environ.get("RESUME_NER_QUANTIZE", "").lower() in ("1", "true", "yes")
+        self.quantize = bool(quantize)
         self._model_loaded = False
-        self._device = 0 if torch.cuda.is_available() else -1
+        # Dynamically quantized kernels only exist for CPU
+        self._device = 0 if torch.cuda.is_available() and not self.quantize else -1
         self.ner_pipeline = None
+        self.max_tokens = max_tokens
+        self.overlap = min(overlap, max_tokens // 2)
+        self.batch_size = batch_size
+
+    @property
+    def variant(self) -> str:
+        return "int8" if self.quantize else "fp32"
 
     def _load_model(self):
         if not self._model_loaded:
-            self.ner_pipeline = pipeline(
-                "ner",
-                model="dslim/bert-base-NER",
-                aggregation_strategy="simple",
-                device=self._device
-            )
+            if self.quantize:
+                tokenizer = AutoTokenizer.from_pretrained(self.MODEL_NAME)
+                model = AutoModelForTokenClassification.from_pretrained(self.MODEL_NAME)
+                model = torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                self.ner_pipeline = pipeline(
+                    "ner",
+                    model=model,
+                    tokenizer=tokenizer,
+                    aggregation_strategy="simple",
+                    device=-1
+                )
+            else:
+                self.ner_pipeline = pipeline(
+                    "ner",
+                    model=self.MODEL_NAME,
+                    aggregation_strategy="simple",
+                    device=self._device
+                )
             self._model_loaded = True
 
+    def _chunk_text(self, text):
+        """
+        Split text into overlapping token windows.
+        Returns (chunk_text, char_offset, own_start, own_end, n_tokens) tuples;
+        each window "owns" the characters up to the middle of its overlaps, which
+        is used to drop the duplicate copy of entities detected twice.
+        """
+        try:
+            offsets = self.ner_pipeline.tokenizer(
+                text, add_special_tokens=False, return_offsets_mapping=True
+            )["offset_mapping"]
+        except Exception:
+            offsets = None  # slow tokenizer without offsets: fall back to one window
+
+        if offsets is None:
+            return [(text, 0, 0, len(text), len(text.split()))]
+
+        n_tokens = len(offsets)
+        if n_tokens <= self.max_tokens:
+            return [(text, 0, 0, len(text), n_tokens)]
+
+        windows = []
+        start = 0
+        while True:
+            end = min(start + self.max_tokens, n_tokens)
+            windows.append((start, end))
+            if end == n_tokens:
+                break
+            start = end - self.overlap
+
+        chunks = []
+        for i, (tok_start, tok_end) in enumerate(windows):
+            char_start = offsets[tok_start][0]
+            char_end = offsets[tok_end - 1][1]
+            own_tok_start = 0 if i == 0 else (tok_start + windows[i - 1][1]) // 2
+            own_tok_end = n_tokens if i == len(windows) - 1 else (windows[i + 1][0] + tok_end) // 2
+            own_start = offsets[own_tok_start][0] if i > 0 else 0
+            own_end = offsets[own_tok_end][0] if own_tok_end < n_tokens else len(text)
+            chunks.append((text[char_start:char_end], char_start, own_start, own_end, tok_end - tok_start))
+        return chunks
+
+    @staticmethod
+    def _merge_chunk_entities(chunks, outputs):
+        """Shift chunk-local entities to document offsets and de-duplicate overlaps"""
+        merged = []
+        seen = set()
+        for (_, char_offset, own_start, own_end, _), entities in zip(chunks, outputs):
+            for entity in entities:
+                entity = dict(entity)
+                if entity.get("start") is not None:
+                    entity["start"] += char_offset
+                    entity["end"] += char_offset
+                    if not own_start <= entity["start"] < own_end:
+                        continue
+                    key = (entity["entity_group"], entity["start"], entity["end"])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                merged.append(entity)
+        return merged
+
     def extract_entities(self, text):
+        return self.extract_entities_batch([text])[0]
+
+    def extract_entities_batch(self, texts, batch_size=None):
+        """
+        Run NER over many documents in one pipeline call.
+        Windows from all documents are sorted by token length so each forward
+        pass pads to a similar length, then regrouped per document.
+
+        If the batched call fails, documents are retried one at a time so one
+        bad document does not cost the others their entities. A document that
+        still fails gets empty entities with "failed" set.
+        """
         self._load_model()  # Only load when first used
+        if not texts:
+            return []
         try:
-            entities = self.ner_pipeline(text)
-            return {
-                "entities": self._format_entities(entities),
-                "raw": entities
-            }
+            doc_chunks = [self._chunk_text(text) for text in texts]
+            flat = [
+                (doc_idx, chunk_idx, chunk)
+                for doc_idx, chunks in enumerate(doc_chunks)
+                for chunk_idx, chunk in enumerate(chunks)
+            ]
+            flat.sort(key=lambda item: item[2][4])
+
+            outputs = self.ner_pipeline(
+                [chunk[0] for _, _, chunk in flat],
+                batch_size=batch_size or self.batch_size
+            )
+
+            doc_outputs = [[None] * len(chunks) for chunks in doc_chunks]
+            for (doc_idx, chunk_idx, _), output in zip(flat, outputs):
+                doc_outputs[doc_idx][chunk_idx] = output
+
+            results = []
+            for chunks, chunk_outputs in zip(doc_chunks, doc_outputs):
+                entities = self._merge_chunk_entities(chunks, chunk_outputs)
+                results.append({
+                    "entities": self._format_entities(entities),
+                    "raw": entities
+                })
+            return results
         except Exception as e:
+            if len(texts) > 1:
+                print(f"NER Error: {e}; retrying documents one at a time")
+                return [self.extract_entities_batch([text], batch_size)[0] for text in texts]
             print(f"NER Error: {e}")
-            return {"entities": {}, "raw": []}
+            return [{"entities": {}, "raw": [], "failed": True}]
 
     def _format_entities(self, raw_entities):
         grouped = {}
@@ -128,8 +268,9 @@ def clean_entities(entity_dict):
     return cleaned
 
 @lru_cache(maxsize=16)
-def split_sections(text: str) -> dict:
+def _split_sections(text: str):
     sections = {}
+    spans = {}
     headers = [
         "Contact", "Profile",
         "Career Objective", "Professional Summary", "Summary", "Objective",
@@ -147,27 +288,49 @@ def split_sections(text: str) -> dict:
     
     current_section = "Header"
     sections[current_section] = ""
+    spans[current_section] = []
     
-    for line in text.split('\n'):
-        line = line.strip()
+    offset = 0
+    for raw_line in text.split('\n'):
+        line_start, line_end = offset, offset + len(raw_line)
+        offset = line_end + 1
+        line = raw_line.strip()
         # Check if line matches any header
         match = re.fullmatch(pattern, line)
         if match:
             current_section = match.group(1).strip().rstrip(':')
             sections[current_section] = ""
+            spans[current_section] = []
         else:
             sections[current_section] += line + "\n"
+            # Track character ranges of the original text covered by each section
+            ranges = spans[current_section]
+            if ranges and ranges[-1][1] + 1 == line_start:
+                ranges[-1] = (ranges[-1][0], line_end)
+            else:
+                ranges.append((line_start, line_end))
     
     sections = {k: v.strip() for k, v in sections.items() if v.strip()}
+    spans = {k: v for k, v in spans.items() if k in sections}
     
     if "Header" in sections:
         header_content = sections.pop("Header")
+        header_spans = spans.pop("Header")
         if any(x in header_content.lower() for x in ["@", "http", "linkedin", "github", "phone"]):
             sections["Contact"] = header_content
+            spans["Contact"] = header_spans
         else:
             sections["Profile"] = header_content
+            spans["Profile"] = header_spans
             
-    return sections
+    return sections, spans
+
+def split_sections(text: str) -> dict:
+    return _split_sections(text)[0]
+
+def section_spans(text: str) -> dict:
+    """Character ranges of text covered by each section returned by split_sections"""
+    return _split_sections(text)[1]
 
 def clean_text(text: str) -> str:
     text = unicodedata.normalize("NFKC", text)
@@ -196,7 +359,8 @@ def extract_text_from_docx(file_path_or_buffer) -> str:
         print(f"Error extracting DOCX text: {e}")
         return ""
 
-def extract_contact_info(text):
+def extract_contact_info(text, entities=None):
+    """entities: optional extract_entities() result for text, reused instead of a fresh NER pass"""
     contact = {}
     lines = text.strip().splitlines()
     if lines:
@@ -205,9 +369,11 @@ def extract_contact_info(text):
             contact["name"] = first_line
     
     if "name" not in contact:
-        entities = ner.extract_entities(text)
-        if "PER" in entities:
-            contact["name"] = " ".join(entities["PER"][:2])
+        if entities is None:
+            entities = ner.extract_entities(text)
+        people = entities.get("entities", {}).get("PER", [])
+        if people:
+            contact["name"] = " ".join(people[:2])
 
     match = re.search(r"[\w\.-]+@[\w\.-]+\.\w+", text)
     if match:
@@ -260,44 +426,31 @@ def extract_education_info(text):
     return education
 
 def extract_skills(text):
+    """
+    Skills mentioned in the skill-bearing sections, including the heading
+    variants split_sections recognises ("Work Experience"). Headings keep the
+    case they were written in ("SKILLS"), so they are compared
+    case-insensitively; a resume without any of these sections is scanned whole.
+    """
     skills_found = set()
     sections = split_sections(text)
+    wanted = {
+        "skills", "technical skills", "key skills", "core competencies",
+        "experience", "work experience", "employment history",
+        "projects", "personal projects", "academic projects", "education"
+    }
+    contents = [content for name, content in sections.items() if name.lower() in wanted] or [text]
     
-    skills_text = ""
-    for section in ["Skills", "Technical Skills", "Key Skills"]:
-        if section in sections:
-            skills_text += sections[section] + "\n"
-    
-    for skill, patterns in SKILL_KEYWORDS.items():
-        for pattern in patterns:
-            if re.search(r"\b" + pattern + r"\b", skills_text, re.IGNORECASE):
-                skills_found.add(skill)
-    
-    other_sections = ["Experience", "Projects", "Education"]
-    for section in other_sections:
-        if section in sections:
-            section_text = sections[section]
-            for skill, patterns in SKILL_KEYWORDS.items():
-                for pattern in patterns:
-                    if re.search(r"\b" + pattern + r"\b", section_text, re.IGNORECASE):
-                        skills_found.add(skill)
+    # One scan per section with the precompiled skill matcher
+    for content in contents:
+        skills_found |= skill_matcher.find_skills(content)
     
     return sorted(skills_found)
 
 def format_skills_output(skills_list):
-    categories = SKILL_CATEGORIES
-    
     output = []
-    for category, patterns in categories.items():
-        skills_in_category = []
-        for skill in skills_list:
-            for pattern in patterns:
-                if re.search(r"\b" + pattern + r"\b", skill.lower()):
-                    skills_in_category.append(skill)
-                    break
-        
-        if skills_in_category:
-            output.append(f"{category}: {', '.join(sorted(set(skills_in_category)))}")
+    for category, skills_in_category in skill_matcher.categorize(skills_list).items():
+        output.append(f"{category}: {', '.join(skills_in_category)}")
     
     return "\n".join(output)
 
@@ -368,45 +521,247 @@ def extract_certifications(text):
     
     return certs
 
-def parse_resume(file_path_or_buffer, file_type=None):
-    """Determine file type and extract text accordingly"""
+_parse_cache = None
+
+def get_parse_cache() -> ParseCache:
+    """Process-wide parse cache shared by the evaluation tab, ranking tab and ResumeRanker"""
+    global _parse_cache
+    if _parse_cache is None:
+        max_mb = int(os.environ.get("RESUME_PARSE_CACHE_MB", "256"))
+        _parse_cache = ParseCache(max_bytes=max_mb * 1024 * 1024)
+    return _parse_cache
+
+class BufferReader(io.RawIOBase):
+    """Read-only, seekable file object over an in-memory buffer without copying it"""
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        chunk = self._view[self._pos:end].tobytes()
+        self._pos = max(self._pos, end)
+        return chunk
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+def open_buffer(data):
+    """File object over bytes-like data; bytes are shared by BytesIO, other buffers are wrapped"""
+    if isinstance(data, bytes):
+        return io.BytesIO(data)  # copy-on-write: no copy while only read
+    return BufferReader(data)
+
+def load_source(source):
+    """
+    Normalise a resume source into (name, data) where data is bytes-like.
+    Accepts a path, bytes/bytearray/memoryview, a (name, data) tuple or a
+    file-like object such as Streamlit's UploadedFile. In-memory buffers are
+    returned as-is rather than copied.
+    """
+    if isinstance(source, tuple):
+        name, data = source
+        return name, load_source(data)[1]
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return os.path.basename(source), f.read()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return "", source
+    name = os.path.basename(str(getattr(source, 'name', "") or ""))
+    if hasattr(source, 'getvalue'):
+        return name, source.getvalue()
+    position = source.tell()
+    source.seek(0)
+    data = source.read()
+    source.seek(position)
+    return name, data
+
+def sniff_file_type(data):
+    """Guess 'pdf' or 'docx' from magic bytes; None if neither"""
+    head = bytes(memoryview(data)[:4])
+    if head.startswith(b"%PDF"):
+        return 'pdf'
+    if head.startswith(b"PK\x03\x04"):
+        return 'docx'
+    return None
+
+def resolve_file_type(file_path_or_buffer, file_type=None, data=None):
     if file_type is None:
-        if hasattr(file_path_or_buffer, 'name'):
-            ext = os.path.splitext(file_path_or_buffer.name)[-1].lower()
-            file_type = 'docx' if ext == '.docx' else 'pdf'
-    
+        if isinstance(file_path_or_buffer, tuple):
+            name = file_path_or_buffer[0]
+        elif isinstance(file_path_or_buffer, (str, os.PathLike)):
+            name = file_path_or_buffer
+        else:
+            name = getattr(file_path_or_buffer, 'name', "") or ""
+        ext = os.path.splitext(str(name))[-1].lower()
+        if ext in ('.pdf', '.docx'):
+            file_type = ext[1:]
+        elif data is not None:
+            file_type = sniff_file_type(data) or 'pdf'
+        else:
+            file_type = 'pdf'
+    return file_type
+
+def read_file_bytes(file_path_or_buffer):
+    """Raw contents of a resume source as bytes-like data, without moving its cursor"""
+    return load_source(file_path_or_buffer)[1]
+
+def _cache_key(kind: str, data: bytes, file_type: str) -> str:
+    version = PARSER_VERSION if kind == "text" else f"{PARSER_VERSION}-{ner.variant}"
+    return f"{kind}:{version}:{file_type}:{content_hash(data)}"
+
+def _extract_text(data, file_type: str) -> str:
     if file_type == 'docx':
-        text = extract_text_from_docx(file_path_or_buffer)
-    else:  # default to PDF
-        text = extract_text_from_pdf(file_path_or_buffer)
-    
+        return extract_text_from_docx(open_buffer(data))
+    return extract_text_from_pdf(open_buffer(data))  # default to PDF
+
+def _cached_text(data: bytes, file_type: str) -> str:
+    cache = get_parse_cache()
+    key = _cache_key("text", data, file_type)
+    text = cache.get(key)
+    if text is None:
+        text = _extract_text(data, file_type)
+        if text:  # don't pin extraction failures in the cache
+            cache.put(key, text)
+    return text
+
+def extract_text(file_path_or_buffer, file_type=None, use_cache=True) -> str:
+    """Extract plain text from a PDF/DOCX path or buffer, memoised on file content"""
+    data = read_file_bytes(file_path_or_buffer)
+    file_type = resolve_file_type(file_path_or_buffer, file_type, data)
+    if not use_cache:
+        return _extract_text(data, file_type)
+    return _cached_text(data, file_type)
+
+def parse_resumes(files, use_cache=True, batch_size=None):
+    """
+    Parse many resumes at once: cache hits are returned directly and all
+    misses share a single batched NER call.
+
+    Each result is the full parsed-resume record, including the raw text and
+    source filename under "metadata", so callers such as ResumeRanker can
+    score it without extracting the file again.
+    """
+    parsed = [None] * len(files)
+    pending = []
+    cache = get_parse_cache() if use_cache else None
+
+    for i, file in enumerate(files):
+        try:
+            name, data = load_source(file)
+            file_type = resolve_file_type(file, data=data)
+        except Exception as e:
+            print(f"Error reading resume: {e}")
+            parsed[i] = {}
+            continue
+        key = _cache_key("parsed", data, file_type)
+        hit = cache.get(key) if cache else None
+        if hit is not None:
+            parsed[i] = _with_filename(hit, name)
+        else:
+            text = _cached_text(data, file_type) if cache else _extract_text(data, file_type)
+            pending.append((i, key, text, file_type, name))
+
+    if pending:
+        entities = ner.extract_entities_batch([text for _, _, text, _, _ in pending], batch_size=batch_size)
+        for (i, key, text, file_type, name), doc_entities in zip(pending, entities):
+            record = _parse_text(text, file_type, doc_entities)
+            if cache and _cacheable(text, record):
+                cache.put(key, record)
+            parsed[i] = _with_filename(record, name)
+
+    return parsed
+
+def _cacheable(text: str, parsed: dict) -> bool:
+    # Extraction and NER failures are retried next time rather than pinned in the cache
+    return bool(text) and not parsed["global_entities"].get("failed")
+
+def _with_filename(parsed, name):
+    # The cache is keyed by content, so the name of this particular upload is set afterwards
+    parsed["metadata"]["filename"] = name
+    return parsed
+
+def parse_resume(file_path_or_buffer, file_type=None, use_cache=True):
+    """Determine file type, extract text and parse it; results are cached by file content"""
+    name, data = load_source(file_path_or_buffer)
+    file_type = resolve_file_type(file_path_or_buffer, file_type, data)
+
+    if use_cache:
+        cache = get_parse_cache()
+        key = _cache_key("parsed", data, file_type)
+        parsed = cache.get(key)
+        if parsed is None:
+            text = _cached_text(data, file_type)
+            parsed = _parse_text(text, file_type)
+            if _cacheable(text, parsed):
+                cache.put(key, parsed)
+        return _with_filename(parsed, name)
+
+    return _with_filename(_parse_text(_extract_text(data, file_type), file_type), name)
+
+def map_entities_to_sections(text: str, raw_entities: list) -> dict:
+    """Group one NER pass over text into per-section labels using character offsets"""
+    sections, spans = _split_sections(text)
+    grouped = {name: [] for name in sections}
+
+    for entity in raw_entities:
+        start = entity.get("start")
+        for section_name, ranges in spans.items():
+            if start is not None:
+                hit = any(lo <= start < hi for lo, hi in ranges)
+            else:
+                # Slow tokenizers report no offsets; fall back to a text lookup
+                hit = entity["word"].lower() in sections[section_name].lower()
+            if hit:
+                grouped[section_name].append(entity)
+                if start is not None:
+                    break
+
+    return {
+        name: clean_entities(ner._format_entities(entities))
+        for name, entities in grouped.items()
+    }
+
+def _parse_text(text: str, file_type: str, global_entities=None) -> dict:
     sections = split_sections(text)
-    global_entities = ner.extract_entities(text)
-
-    # Extract entities from all section texts combined
-    all_section_texts = "\n\n".join(sections.values())
-    batch_entities = ner.extract_entities(all_section_texts)
-
-    # Filter relevant entities for each section
-    section_entities = {}
-    # Map entity labels present in each section using cleaned entities for stability
-    cleaned_batch = clean_entities(batch_entities.get("entities", {})) if isinstance(batch_entities, dict) else {}
-    for section_name, section_text in sections.items():
-        present_labels = {}
-        for label, words in cleaned_batch.items():
-            hits = [w for w in words if w.lower() in section_text.lower()]
-            if hits:
-                present_labels[label] = hits
-        section_entities[section_name] = present_labels
+
+    # A single NER pass over the document; section entities and the contact-name
+    # fallback are derived from its character offsets instead of re-running NER
+    if global_entities is None:
+        global_entities = ner.extract_entities(text)
+    section_entities = map_entities_to_sections(text, global_entities.get("raw", []))
+
     return {
         "metadata": {
             "processing_date": datetime.now().isoformat(),
-            "file_type": file_type
+            "file_type": file_type,
+            "text": text
         },
         "sections": sections,
         "global_entities": global_entities,
         "section_entities": section_entities, 
-        "contact": extract_contact_info(text),
+        "contact": extract_contact_info(text, global_entities),
         "education": extract_education_info(text),
         "skills": extract_skills(text),
         "projects": extract_projects(text),
@@ -1,104 +1,503 @@
 import os
 import re
+import heapq
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
-from typing import List, Union
-from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from modules import parser, similarity
+from modules.cache import content_hash
+from modules.skill_matcher import skill_matcher, filter_bitsets
+
+EMAIL_PATTERN = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+PHONE_PATTERN = re.compile(r"(\+91[-\s]?)?[0-9]{10}")
+
+# Resumes can be given as file paths, bytes/memoryviews, (name, data) tuples
+# or file-like objects such as Streamlit uploads
+ResumeSource = Union[str, os.PathLike, bytes, bytearray, memoryview, tuple, Any]
+
+# Extraction lives at module level so it can be shipped to worker processes
+# by reference; only file paths go in and compact record dicts come back.
+
+def _extract_email(text: str) -> str:
+    match = EMAIL_PATTERN.search(text)
+    return match.group(0) if match else "N/A"
+
+def _extract_phone(text: str) -> str:
+    match = PHONE_PATTERN.search(text)
+    return match.group(0).strip() if match else "N/A"
+
+def _extract_name(text: str, filename: str) -> str:
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    for line in lines[:3]:
+        if (1 <= len(line.split()) <= 3 and 
+            not any(x in line.lower() for x in ["@", "linkedin", "github", "http"])):
+            return line
+    return os.path.splitext(os.path.basename(filename))[0]
+
+def _extract_metadata(text: str, filename: str, skills: Optional[List[str]] = None) -> dict:
+    """
+    Ranking record for a resume. Skills come from parser.extract_skills (or
+    a parse_resume result passing them in), the same list the preview shows;
+    their bitset is packed once here for the skill filters. A resume whose
+    headings aren't recognised is scanned whole, so it isn't filtered out
+    for having no skills.
+    """
+    skills = sorted(parser.extract_skills(text) if skills is None else skills)
+    return {
+        'name': _extract_name(text, filename),
+        'email': _extract_email(text),
+        'phone': _extract_phone(text),
+        'filename': filename,
+        'skills': skills,
+        'skill_bits': skill_matcher.bitset(skills),
+        'text': text
+    }
+
+def _init_worker() -> None:
+    """
+    Process-pool initializer. A forked worker inherits the parent's parse
+    cache, whose SQLite connection must not be used across a fork; drop it so
+    the worker opens its own on first use.
+    """
+    parser._parse_cache = None
+
+def _extract_single(source: ResumeSource) -> Union[dict, None]:
+    filename = "resume"
+    try:
+        # In-memory sources are read straight from their buffer, no temp files
+        name, data = parser.load_source(source)
+        ext = os.path.splitext(name)[-1].lower()
+        file_type = ext[1:] if ext else parser.sniff_file_type(data)
+        filename = name or f"resume-{content_hash(data)[:12]}.{file_type or 'bin'}"
+
+        if file_type not in ("pdf", "docx"):
+            print(f"Unsupported file format: {filename}")
+            return None
+
+        # Shared content-addressed cache: re-uploaded files skip extraction
+        text = parser.extract_text((filename, data), file_type)
+        return _extract_metadata(text, filename)
+
+    except Exception as e:
+        print(f"Skipped {filename} due to error: {str(e)}")
+        return None
+
+def _picklable(source: ResumeSource) -> ResumeSource:
+    """Paths stay paths; buffers become (name, bytes) so they can cross process boundaries"""
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    name, data = parser.load_source(source)
+    return name, bytes(data)
+
 
 class ResumeRanker:
     """High-performance resume ranking based on job description"""
 
-    def __init__(self, min_score: float = 0.0, workers: int = 4):
+    def __init__(
+        self,
+        min_score: float = 0.0,
+        workers: Optional[int] = None,
+        executor: str = "thread",
+        cascade_top_k: Optional[int] = None,
+        cascade_margin: Optional[int] = None,
+        cascade_measure_recall: bool = False,
+        index: Optional[Any] = None,
+        required_skills: Optional[List[str]] = None,
+        excluded_skills: Optional[List[str]] = None,
+        any_skills: Optional[List[str]] = None
+    ):
         """
         Args:
             min_score: Minimum similarity score (0-1) to include in results
-            workers: Number of threads for parallel processing
+            workers: Number of parallel workers (default: 4 threads, or one
+                process per CPU core in process mode)
+            executor: "thread" or "process". PDF/DOCX extraction is pure Python
+                and GIL-bound, so large batches scale with cores only in process mode.
+            cascade_top_k: If set, process_batch, rank_parsed and the final
+                update of iter_rank / iter_rank_parsed rank with
+                ResumeMatcher.cascade_rank: TF-IDF + MiniLM for everyone, mpnet
+                re-scoring for the best cascade_top_k + cascade_margin only.
+                The returned table carries the stage timings (and, with
+                cascade_measure_recall, recall@k against full re-ranking) in
+                df.attrs["cascade"].
+            index: Optional candidate_index.CandidateIndex; every resume this
+                ranker extracts is added to it for later re-screening.
+            required_skills / excluded_skills / any_skills: Hard skill filters
+                (names from SKILL_KEYWORDS). Resumes failing them are dropped
+                with bitset operations before any TF-IDF or embedding work.
         """
+        if executor not in ("thread", "process"):
+            raise ValueError("executor must be 'thread' or 'process'")
         self.min_score = min_score * 100  # Convert to percentage
+        self.executor = executor
+        if workers is None:
+            workers = (os.cpu_count() or 1) if executor == "process" else 4
         self.workers = workers
+        self.cascade_top_k = cascade_top_k
+        self.cascade_margin = cascade_margin
+        self.cascade_measure_recall = cascade_measure_recall
+        self.index = index
+        # Validated up front: an unknown skill name raises here, not mid-batch
+        self.skill_filters = None
+        if required_skills or excluded_skills or any_skills:
+            self.skill_filters = {
+                "required": skill_matcher.bitset(required_skills or []),
+                "excluded": skill_matcher.bitset(excluded_skills or []),
+                "any_of": skill_matcher.bitset(any_skills or [])
+            }
         self.matcher = similarity.ResumeMatcher(method="tfidf")
-        self.email_pattern = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
-        self.phone_pattern = re.compile(r"(\+91[-\s]?)?[0-9]{10}")
-        self.jd_text = None
-
-    def _extract_email(self, text: str) -> str:
-        match = self.email_pattern.search(text)
-        return match.group(0) if match else "N/A"
-
-    def _extract_phone(self, text: str) -> str:
-        match = self.phone_pattern.search(text)
-        return match.group(0).strip() if match else "N/A"
-
-    def _extract_name(self, text: str, filename: str) -> str:
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        for line in lines[:3]:
-            if (1 <= len(line.split()) <= 3 and 
-                not any(x in line.lower() for x in ["@", "linkedin", "github", "http"])):
-                return line
-        return os.path.splitext(os.path.basename(filename))[0]
-
-    def _extract_metadata(self, text: str, filename: str) -> dict:
-        return {
-            'name': self._extract_name(text, filename),
-            'email': self._extract_email(text),
-            'phone': self._extract_phone(text),
-            'text': text
-        }
 
-    def _process_single(self, filepath: Union[str, os.PathLike]) -> Union[dict, None]:
-        filename = os.path.basename(filepath)
-        try:
-            ext = os.path.splitext(filename)[-1].lower()
-
-            if ext == ".pdf":
-                with open(filepath, 'rb') as f:
-                    text = parser.extract_text_from_pdf(f)
-            elif ext == ".docx":
-                with open(filepath, 'rb') as f:
-                    text = parser.extract_text_from_docx(f)
-            else:
-                print(f"Unsupported file format: {filename}")
-                return None
+    def _make_executor(self):
+        if self.executor == "process":
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return ThreadPoolExecutor(max_workers=self.workers)
 
-            meta = self._extract_metadata(text, filename)
-            score = self.matcher.get_similarity_score(
-                self.jd_text, [text], mode="raw"
-            )[0][1] * 100
+    def _prepare_sources(self, resumes: List[ResumeSource]) -> List[ResumeSource]:
+        if self.executor == "process":
+            return [_picklable(source) for source in resumes]
+        return list(resumes)
 
-            return {
-                "Name": meta['name'],
-                "Score (%)": round(score, 2),
-                "Email": meta['email'],
-                "Phone": meta['phone'],
-                "Filename": filename
-            }
+    def _extract_all(self, resume_paths: List[ResumeSource]) -> List[Union[dict, None]]:
+        resume_paths = self._prepare_sources(resume_paths)
+        # Send paths in chunks so IPC overhead is paid per chunk, not per file
+        chunksize = max(1, len(resume_paths) // (self.workers * 4)) if self.executor == "process" else 1
+        with self._make_executor() as executor:
+            return list(tqdm(
+                executor.map(_extract_single, resume_paths, chunksize=chunksize),
+                total=len(resume_paths),
+                desc="Extracting resumes"
+            ))
 
+    def _remember(self, records: List[dict]) -> None:
+        """Add extracted records to the candidate index, if one is attached"""
+        if self.index is None or not records:
+            return
+        try:
+            self.index.add(records)
         except Exception as e:
-            print(f"Skipped {filename} due to error: {str(e)}")
-            return None
+            print(f"Could not add resumes to the candidate index: {str(e)}")
+
+    def _filter_skills(self, records: List[dict]) -> List[dict]:
+        """Drop records failing the skill filters, evaluated on their skill bitsets"""
+        if self.skill_filters is None or not records:
+            return records
+        matrix = np.vstack([r['skill_bits'] for r in records])
+        keep = filter_bitsets(matrix, **self.skill_filters)
+        return [record for record, kept in zip(records, keep) if kept]
+
+    def _score_records(self, records: List[dict], context: similarity.JDScoringContext) -> List[dict]:
+        """Score every extracted resume against the JD in a single vectorized call"""
+        if not records:
+            return []
+
+        scores = self.matcher.get_similarity_score(
+            context, [r['text'] for r in records], mode="raw"
+        )
 
-    def process_batch(self, resume_paths: List[str], jd_text: str) -> pd.DataFrame:
+        return [self._row(records[idx], score) for idx, score in scores]
+
+    def _rank_frame(self, records: List[dict], context: similarity.JDScoringContext) -> pd.DataFrame:
+        """
+        Ranked table for a pool. With cascade ranking, stage-1 and re-ranked
+        scores come from different models, so rows carry a Stage column that
+        to_frame sorts on first, and the cascade report goes in df.attrs.
+        """
+        if not self.cascade_top_k:
+            return self.to_frame(self._score_records(records, context))
+        if not records:
+            return self.to_frame([])
+
+        rows, report = self._cascade_rows(records, context)
+        df = self.to_frame(rows)
+        df.attrs["cascade"] = report
+        return df
+
+    def _cascade_rows(self, records: List[dict], context: similarity.JDScoringContext) -> Tuple[List[dict], dict]:
+        """Rows in cascade order (re-ranked first, with a Stage column) and the cascade report"""
+        cascade = self.matcher.cascade_rank(
+            context, [r['text'] for r in records],
+            top_k=self.cascade_top_k, margin=self.cascade_margin,
+            measure_recall=self.cascade_measure_recall
+        )
+        shortlist = set(cascade["shortlist"])
+        rows = []
+        for idx, score in cascade["scores"]:
+            row = self._row(records[idx], score)
+            row["Stage"] = "re-ranked" if idx in shortlist else "pre-filter"
+            rows.append(row)
+
+        report = {
+            "timings": cascade["timings"],
+            "recall_at_k": cascade["recall_at_k"],
+            "reranked": [records[i]['filename'] for i in cascade["shortlist"]]
+        }
+        return rows, report
+
+    @staticmethod
+    def _row(meta: dict, score: float) -> dict:
+        return {
+            "Name": meta['name'],
+            "Score (%)": round(float(score) * 100, 2),
+            "Email": meta['email'],
+            "Phone": meta['phone'],
+            "Filename": meta['filename'],
+            "Skills": ", ".join(meta.get('skills', []))
+        }
+
+    def process_batch(self, resume_paths: List[ResumeSource], jd_text: str) -> pd.DataFrame:
+        """Rank resumes (paths or in-memory buffers) against a job description"""
         if not jd_text:
             raise ValueError("Job description text must be provided.")
 
-        self.jd_text = jd_text
+        # Phase 1: extract text and metadata in parallel
+        extracted = self._extract_all(resume_paths)
 
-        with ThreadPoolExecutor(max_workers=self.workers) as executor:
-            results = list(tqdm(
-                executor.map(self._process_single, resume_paths),
-                total=len(resume_paths),
-                desc="Processing resumes"
-            ))
+        # Phase 2: one TF-IDF transform and one matrix product for the whole batch.
+        # The JD context is built per call and never stored on the ranker, so
+        # concurrent sessions sharing this instance cannot clobber each other.
+        records = [r for r in extracted if r is not None]
+        self._remember(records)
+        records = self._filter_skills(records)
+        context = self.matcher.build_context(jd_text, [r['text'] for r in records])
+        return self._rank_frame(records, context)
 
-        df = pd.DataFrame([r for r in results if r is not None])
+    def process_matrix(
+        self,
+        resume_paths: List[ResumeSource],
+        jd_texts: Union[List[str], Dict[str, str]]
+    ) -> Dict[str, Any]:
+        """
+        Rank one applicant pool against several job descriptions at once.
+
+        Each resume is extracted and encoded a single time, and all JDs share
+        one TF-IDF fit over the pool (see ResumeMatcher.score_matrix), so the
+        TF-IDF part of a score can differ slightly from process_batch for
+        that JD. jd_texts may be a list or a {requisition name: JD text}
+        dict. Returns:
+            "matrix": DataFrame of scores (%), one row per JD, one column per file
+            "rankings": {requisition: ranked DataFrame, laid out as from process_batch}
+            "assignments": each candidate's best-scoring requisition
+        """
+        if isinstance(jd_texts, dict):
+            labels, jd_texts = list(jd_texts.keys()), list(jd_texts.values())
+        else:
+            jd_texts = list(jd_texts)
+            labels = [f"JD {i + 1}" for i in range(len(jd_texts))]
+        if not jd_texts or not all(jd_texts):
+            raise ValueError("Job description text must be provided.")
+
+        records = [r for r in self._extract_all(resume_paths) if r is not None]
+        self._remember(records)
+        records = self._filter_skills(records)
+        scores = self.matcher.score_matrix(jd_texts, [r['text'] for r in records])
+
+        rankings = {
+            label: self.to_frame([self._row(meta, score) for meta, score in zip(records, row)])
+            for label, row in zip(labels, scores)
+        }
+
+        assignments = []
+        if records:
+            best = scores.argmax(axis=0)
+            for i, meta in enumerate(records):
+                row = self._row(meta, scores[best[i], i])
+                row["Best Requisition"] = labels[best[i]]
+                assignments.append(row)
+
+        matrix = pd.DataFrame(
+            np.round(scores * 100, 2),
+            index=pd.Index(labels, name="Requisition"),
+            columns=[r['filename'] for r in records]
+        )
+        return {
+            "matrix": matrix,
+            "rankings": rankings,
+            "assignments": self.to_frame(assignments)
+        }
+
+    @staticmethod
+    def to_frame(results: List[dict]) -> pd.DataFrame:
+        """Build the ranked results table from scored rows"""
+        df = pd.DataFrame(results)
 
         if not df.empty:
-            df.sort_values("Score (%)", ascending=False, inplace=True)
+            if "Stage" in df:
+                # Cascade results: re-ranked rows outrank pre-filter-only rows
+                df["_reranked"] = df["Stage"] == "re-ranked"
+                df.sort_values(["_reranked", "Score (%)"], ascending=False, inplace=True)
+                df.drop(columns="_reranked", inplace=True)
+            else:
+                df.sort_values("Score (%)", ascending=False, inplace=True)
             df.reset_index(drop=True, inplace=True)
             df.index += 1
             df.index.name = "Rank"
 
         return df if not df.empty else pd.DataFrame(
-            columns=["Rank", "Name", "Score (%)", "Email", "Phone", "Filename"]
+            columns=["Rank", "Name", "Score (%)", "Email", "Phone", "Filename", "Skills"]
+        )
+
+    def _stream_scores(
+        self,
+        arrivals: Iterator,
+        jd_text: str,
+        total: int,
+        top_k: int,
+        warmup: int
+    ) -> Iterator[Dict]:
+        """
+        Score records as they arrive. `arrivals` yields (records, n_files) pairs.
+
+        Unless the JD has a cached context that scores on its own (embedding-
+        only matchers), records are buffered until `warmup` of them (or every
+        file) have arrived and a provisional context is fitted on those. Which files come first depends on completion order, so once
+        every file is in, all records are rescored against a context fitted on
+        the whole pool, as process_batch would, and a last update with
+        "rescored" set is yielded. With cascade ranking that last update is
+        always sent: its rows come from cascade_rank over the whole pool, in
+        cascade order, and it carries the cascade report under "cascade".
+        """
+        context = self.matcher.get_cached_context(jd_text)
+        provisional = False
+        all_records = []
+        buffered = []
+        results = []
+        top = []  # min-heap of (score, -arrival, row), at most top_k entries
+        processed = 0
+
+        def push(rows):
+            for row in rows:
+                entry = (row["Score (%)"], -len(results), row)
+                results.append(row)
+                if len(top) < top_k:
+                    heapq.heappush(top, entry)
+                elif entry[:2] > top[0][:2]:
+                    heapq.heapreplace(top, entry)
+
+        def update(new_rows, rescored=False):
+            return {
+                "new": new_rows,
+                "top": [row for *_, row in sorted(top, key=lambda e: e[:2], reverse=True)],
+                "results": results,
+                "processed": processed,
+                "total": total,
+                "rescored": rescored
+            }
+
+        for records, n_files in arrivals:
+            processed += n_files
+            self._remember(records)
+            records = self._filter_skills(records)
+            new_rows = []
+
+            all_records.extend(records)
+            if context is None:
+                buffered.extend(records)
+                if buffered and (len(buffered) >= warmup or processed >= total):
+                    provisional = processed < total
+                    context = self.matcher.build_context(jd_text, [r['text'] for r in buffered])
+                    new_rows = self._score_records(buffered, context)
+                    buffered = []
+            elif records:
+                new_rows = self._score_records(records, context)
+
+            push(new_rows)
+            yield update(new_rows)
+
+        if not all_records or not (provisional or self.cascade_top_k):
+            return
+        if provisional:
+            context = self.matcher.build_context(jd_text, [r['text'] for r in all_records])
+        results, top = [], []
+        if not self.cascade_top_k:
+            push(self._score_records(all_records, context))
+            yield update([], rescored=True)
+            return
+
+        # Cascade scores from different stages are not comparable, so the
+        # final order is the cascade's own rather than the score heap's
+        rows, report = self._cascade_rows(all_records, context)
+        results.extend(rows)
+        final = update([], rescored=True)
+        final["top"] = rows[:top_k]
+        final["cascade"] = report
+        yield final
+
+    def iter_rank(
+        self,
+        resume_paths: List[ResumeSource],
+        jd_text: str,
+        top_k: int = 10,
+        warmup: int = 8
+    ) -> Iterator[Dict]:
+        """
+        Rank resumes incrementally, yielding an update as each file finishes.
+
+        Each update is a dict with the newly scored rows ("new"), the current
+        top-k rows ("top"), every row scored so far ("results"), the
+        "processed"/"total" file counts and a "rescored" flag.
+
+        Unless the JD has a cached context that needs no TF-IDF fit, the
+        first `warmup` resumes are buffered to fit a provisional one and
+        everything after is scored on arrival. Those scores are approximate:
+        a last update ("rescored": True) replaces them with scores from a
+        context fitted on every resume, matching process_batch. With
+        cascade_top_k, that last update holds the cascade ranking of the
+        whole pool instead (see _stream_scores).
+        """
+        if not jd_text:
+            raise ValueError("Job description text must be provided.")
+
+        resume_paths = self._prepare_sources(resume_paths)
+
+        with self._make_executor() as executor:
+            futures = [executor.submit(_extract_single, path) for path in resume_paths]
+            arrivals = (
+                ([record] if record is not None else [], 1)
+                for record in (future.result() for future in as_completed(futures))
+            )
+            yield from self._stream_scores(arrivals, jd_text, len(resume_paths), top_k, warmup)
+
+    @staticmethod
+    def record_from_parsed(parsed: dict) -> Union[dict, None]:
+        """Ranking record (name, contact, text) from a parser.parse_resumes result"""
+        metadata = (parsed or {}).get("metadata", {})
+        text = metadata.get("text")
+        if not text:
+            return None
+        filename = metadata.get("filename") or f"resume.{metadata.get('file_type', 'pdf')}"
+        return _extract_metadata(text, filename, parsed.get("skills"))
+
+    def iter_rank_parsed(
+        self,
+        parsed_batches: Iterator[List[dict]],
+        jd_text: str,
+        total: int,
+        top_k: int = 10,
+        warmup: int = 8
+    ) -> Iterator[Dict]:
+        """
+        Like iter_rank, but consumes batches of already-parsed resumes (the
+        records produced by parser.parse_resumes), so a document parsed for
+        preview is never extracted again for ranking.
+        """
+        if not jd_text:
+            raise ValueError("Job description text must be provided.")
+
+        arrivals = (
+            ([r for r in map(self.record_from_parsed, batch) if r is not None], len(batch))
+            for batch in parsed_batches
         )
+        yield from self._stream_scores(arrivals, jd_text, total, top_k, warmup)
+
+    def rank_parsed(self, parsed_resumes: List[dict], jd_text: str) -> pd.DataFrame:
+        """Rank already-parsed resumes in one vectorized scoring call"""
+        if not jd_text:
+            raise ValueError("Job description text must be provided.")
+
+        records = [r for r in map(self.record_from_parsed, parsed_resumes) if r is not None]
+        self._remember(records)
+        records = self._filter_skills(records)
+        context = self.matcher.build_context(jd_text, [r['text'] for r in records])
+        return self._rank_frame(records, context)
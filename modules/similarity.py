@@ -1,19 +1,56 @@
 import re
+import time
+import hashlib
+import threading
 import unicodedata
 import logging
 import numpy as np
-from typing import List, Tuple, Dict, Union, Optional
-from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Any, List, Tuple, Dict, Union, Optional
+from collections import Counter, defaultdict, OrderedDict
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from scipy import sparse
 from sentence_transformers import SentenceTransformer
 import torch
-from modules.text_constants import STOPWORDS 
+from modules.text_constants import STOPWORDS, SKILL_KEYWORDS, SKILL_SYNONYMS
+from modules.embedding_store import EmbeddingStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Known skill phrases: SKILL_SYNONYMS categories and synonyms plus SKILL_KEYWORDS names
+SKILL_VOCABULARY = sorted(
+    {skill.lower() for skill in SKILL_KEYWORDS}
+    | set(SKILL_SYNONYMS)
+    | {synonym for synonyms in SKILL_SYNONYMS.values() for synonym in synonyms}
+)
+# Longest first, so "spring boot" wins over "spring"; the boundaries allow
+# symbols inside skills ("c++", "node.js") but not glued to a longer token
+_SKILL_PATTERN = re.compile(
+    r"(?<![\w+#.])(?:"
+    + "|".join(re.escape(p) for p in sorted(SKILL_VOCABULARY, key=len, reverse=True))
+    + r")(?![\w+#])"
+)
+
+
+@dataclass(frozen=True)
+class JDScoringContext:
+    """
+    Read-only fitted state for scoring resumes against one job description.
+    Built once per request and handed to workers; nothing in it is mutated
+    after construction, so any number of threads can score against it.
+    """
+    key: str
+    jd_text: str
+    vectorizer: Optional[TfidfVectorizer] = None
+    jd_vector: Optional[Any] = None
+    jd_embedding: Optional[np.ndarray] = None
+    jd_chunks: Optional[np.ndarray] = None
+
+
 class ResumeMatcher:
     """
     Advanced resume-job description matching system with semantic understanding.
@@ -27,11 +64,33 @@ class ResumeMatcher:
         min_skill_match: float = 0.65,
         use_gpu: bool = False,
         embedding_model: str = 'balanced',  # fast/balanced/accurate
-        tfidf_params: Optional[Dict] = None
+        tfidf_params: Optional[Dict] = None,
+        context_cache_size: int = 32,
+        embedding_cache: bool = True,
+        embedding_cache_dir: Optional[str] = None,
+        embedding_cache_dtype: str = "float32",
+        chunk_pooling: Optional[str] = None,
+        chunk_tokens: Optional[int] = None,
+        chunk_overlap: int = 32,
+        token_budget: int = 8192,
+        max_batch_size: int = 64
     ):
         """
         Initialize matcher with enhanced configuration options.
+        With embedding_cache, encoded texts are persisted in a memory-mapped
+        EmbeddingStore keyed by (model, cleaned-text hash) and never re-encoded.
+
+        chunk_pooling ("mean" or "max") embeds long documents as overlapping
+        chunks of at most chunk_tokens tokens (default: the encoder's max
+        sequence length) instead of letting the encoder truncate them. "mean"
+        averages chunk embeddings; "max" scores each JD chunk against its best
+        resume chunk and averages over JD chunks.
+
+        Encoder batches are formed by token length: at most max_batch_size
+        documents and token_budget padded tokens per batch.
         """
+        if chunk_pooling not in (None, "mean", "max"):
+            raise ValueError("chunk_pooling must be None, 'mean' or 'max'")
         self.method = method
         self.section_weights = section_weights or {
             'skills': 0.6,
@@ -64,6 +123,40 @@ class ResumeMatcher:
             except Exception as e:
                 logger.error(f"Embedding model failed: {str(e)}")
                 self.method = 'tfidf' if method != 'hybrid' else 'tfidf-only'
+
+        self.embedding_store = None
+        if embedding_cache and self.method in ('hybrid', 'embedding'):
+            try:
+                self.embedding_store = EmbeddingStore(
+                    self.embedding_model_name,
+                    self.embedding_model.get_sentence_embedding_dimension(),
+                    directory=embedding_cache_dir,
+                    dtype=embedding_cache_dtype
+                )
+            except Exception as e:
+                logger.error(f"Embedding cache unavailable: {str(e)}")
+
+        # Settings shared with the per-tier matchers used by cascade_rank
+        self._tier_options = {
+            "use_gpu": use_gpu,
+            "embedding_cache": embedding_cache,
+            "embedding_cache_dir": embedding_cache_dir,
+            "embedding_cache_dtype": embedding_cache_dtype,
+            "chunk_pooling": chunk_pooling,
+            "chunk_overlap": chunk_overlap,
+            "token_budget": token_budget,
+            "max_batch_size": max_batch_size
+        }
+        self._tier_matchers = {}
+
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.chunk_pooling = chunk_pooling
+        self.chunk_overlap = chunk_overlap
+        self.chunk_tokens = chunk_tokens
+        if chunk_pooling and chunk_tokens is None and self.method in ('hybrid', 'embedding'):
+            # Leave room for the [CLS]/[SEP] tokens the encoder adds
+            self.chunk_tokens = max(8, (self.embedding_model.max_seq_length or 512) - 2)
         
         # Enhanced TF-IDF configuration
         if self.method in ('hybrid', 'tfidf'):
@@ -73,8 +166,22 @@ class ResumeMatcher:
                 'min_df': 2,
                 'max_features': 5000
             }
-            self.vectorizer = TfidfVectorizer(**self.tfidf_params)
-            self.jd_vector = None
+
+        # JD-side scoring state (cleaned text, embedding, chunks) keyed by
+        # cleaned-JD hash, LRU ordered. TF-IDF is never cached: its vocabulary
+        # and IDF depend on the resumes it is fitted with. The lock only
+        # guards the cache bookkeeping; contexts themselves are immutable.
+        self.context_cache_size = max(1, context_cache_size)
+        self._context_cache = OrderedDict()
+        self._context_lock = threading.Lock()
+
+        # Precomputed predefined-JD artifacts (see jd_handler.JDBundle), and
+        # the TF-IDF model over all of its JDs used to shortlist roles
+        self.bundle = None
+        self._bundle_tfidf = None
+
+        # Skill vocabulary and its embedding matrix, built on first match_skills
+        self._skill_vocabulary = None
 
     @staticmethod
     def clean_text(text: str) -> str:
@@ -103,8 +210,8 @@ class ResumeMatcher:
         
         return text
 
-    def combine_structured_resume(self, resume_data: Dict) -> str:
-        """Enhanced resume combining with semantic weighting"""
+    def section_texts(self, resume_data: Dict) -> Dict[str, str]:
+        """Cleaned text of each non-empty, positively weighted section"""
         combined = defaultdict(list)
         
         for section, content in resume_data.items():
@@ -122,86 +229,752 @@ class ResumeMatcher:
             elif isinstance(content, str):
                 combined[section].append(content)
         
-        # Apply section weights with exponential boosting
-        weighted_text = []
+        sections = {}
         for section, text_parts in combined.items():
-            weight = self.section_weights.get(section, 1.0)
-            if weight > 0:
-                section_text = " ".join(text_parts)
-                weighted_text.append((section_text + " ") * int(weight * 15))
-        
-        return self.clean_text(" ".join(weighted_text))
+            if self.section_weights.get(section, 1.0) > 0:
+                section_text = self.clean_text(" ".join(text_parts))
+                if section_text:
+                    sections[section] = section_text
+        return sections
 
-    def compute_tfidf_similarity(self, jd_text: str, resume_texts: List[str]) -> List[float]:
-        """Enhanced TF-IDF with dynamic fitting"""
-        try:
-            if self.jd_vector is None:
-                all_texts = [self.clean_text(jd_text)] + [self.clean_text(r) for r in resume_texts]
-                tfidf_matrix = self.vectorizer.fit_transform(all_texts)
-                self.jd_vector = tfidf_matrix[0:1]
-                resume_vectors = tfidf_matrix[1:]
+    def combine_structured_resume(self, resume_data: Dict) -> str:
+        """
+        Plain-text view of a structured resume with each section once.
+        Section weights are applied to section vectors (see _weighted_units),
+        not by repeating text.
+        """
+        return " ".join(self.section_texts(resume_data).values())
+
+    def _weighted_units(self, resumes: List[Union[str, Dict]]) -> Tuple[List[str], sparse.csr_matrix]:
+        """
+        Flatten resumes into the texts to vectorize plus a (n_resumes, n_texts)
+        weight matrix. A plain-text resume is one text of weight 1; a structured
+        resume gives one text per section, weighted by section_weights. The
+        product of the weights with the text vectors is each resume's vector.
+        """
+        units, rows, cols, weights = [], [], [], []
+        for i, resume in enumerate(resumes):
+            if isinstance(resume, dict):
+                parts = [
+                    (text, self.section_weights.get(section, 1.0))
+                    for section, text in self.section_texts(resume).items()
+                ]
             else:
-                resume_vectors = self.vectorizer.transform(
-                    [self.clean_text(r) for r in resume_texts]
+                parts = [(self.clean_text(resume), 1.0)]
+            for text, weight in parts:
+                rows.append(i)
+                cols.append(len(units))
+                weights.append(weight)
+                units.append(text)
+        matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(len(resumes), len(units)))
+        return units, matrix
+
+    def _tfidf_vectors(self, vectorizer: TfidfVectorizer, resumes: List[Union[str, Dict]]):
+        """L2-normalized TF-IDF rows, one per resume, from weighted section vectors"""
+        units, weights = self._weighted_units(resumes)
+        if not units:
+            return sparse.csr_matrix((len(resumes), len(vectorizer.vocabulary_)))
+        return normalize(weights @ vectorizer.transform(units))
+
+    def _embedding_vectors(self, resumes: List[Union[str, Dict]]) -> np.ndarray:
+        """L2-normalized embeddings, one per resume, from weighted section embeddings"""
+        units, weights = self._weighted_units(resumes)
+        if not units:
+            return np.zeros((len(resumes), self.embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+        return normalize(weights @ self._embed_documents(units)).astype(np.float32, copy=False)
+
+    @property
+    def embedding_signature(self) -> str:
+        """Identifies how document embeddings are produced (model and chunking)"""
+        if not self.chunk_pooling:
+            return self.embedding_model_name
+        return f"{self.embedding_model_name}+chunks{self.chunk_tokens}/{self.chunk_overlap}"
+
+    def _chunk_documents(self, documents: List[str]) -> List[List[str]]:
+        """
+        Split each document into overlapping token-bounded chunks, cut at
+        token boundaries from the encoder's own tokenizer (one batched call).
+        """
+        size = self.chunk_tokens
+        stride = max(1, size - self.chunk_overlap)
+        encoded = self.embedding_model.tokenizer(
+            documents,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False
+        )
+        chunks = []
+        for document, offsets in zip(documents, encoded["offset_mapping"]):
+            if len(offsets) <= size:
+                chunks.append([document])
+                continue
+            pieces = []
+            for start in range(0, len(offsets), stride):
+                window = offsets[start:start + size]
+                pieces.append(document[window[0][0]:window[-1][1]])
+                if start + size >= len(offsets):
+                    break
+            chunks.append(pieces)
+        return chunks
+
+    def _encode_chunks(self, documents: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encode every chunk of every document in one batched call. Returns the
+        chunk embeddings (documents' chunks are contiguous, in order) and the
+        start row of each document's chunks.
+        """
+        chunked = self._chunk_documents(documents)
+        starts = np.cumsum([0] + [len(c) for c in chunked[:-1]])
+        embeddings = self._encode([chunk for pieces in chunked for chunk in pieces])
+        return embeddings, starts
+
+    def _embed_documents(self, documents: List[str]) -> np.ndarray:
+        """One L2-normalized embedding per document, mean-pooled over chunks when chunking"""
+        if not self.chunk_pooling:
+            return self._encode(documents)
+        embeddings, starts = self._encode_chunks(documents)
+        return normalize(np.add.reduceat(embeddings, starts, axis=0)).astype(np.float32, copy=False)
+
+    def _maxsim_scores(self, jd_chunks: List[np.ndarray], resumes: List[Union[str, Dict]]) -> np.ndarray:
+        """
+        Max-sim scores, shape (n_jds, n_resumes): each JD chunk takes its best
+        match among a text's chunks, averaged over the JD's chunks; structured
+        resumes then average their sections' scores by section weight.
+        """
+        units, weights = self._weighted_units(resumes)
+        if not units:
+            return np.zeros((len(jd_chunks), len(resumes)), dtype=np.float32)
+        embeddings, starts = self._encode_chunks(units)
+
+        jd_starts = np.cumsum([0] + [len(c) for c in jd_chunks[:-1]])
+        jd_sizes = np.array([len(c) for c in jd_chunks])
+        similarities = np.vstack(jd_chunks) @ embeddings.T
+        best = np.maximum.reduceat(similarities, starts, axis=1)
+        unit_scores = np.add.reduceat(best, jd_starts, axis=0) / jd_sizes[:, None]
+
+        totals = np.asarray(weights.sum(axis=1)).ravel()
+        totals[totals == 0] = 1.0
+        return np.asarray(weights @ unit_scores.T).T / totals
+
+    @staticmethod
+    def jd_key(jd_text: str) -> str:
+        """Stable cache key for a job description: SHA-256 of its cleaned text"""
+        return ResumeMatcher._clean_key(ResumeMatcher.clean_text(jd_text))
+
+    @staticmethod
+    def _clean_key(clean_jd: str) -> str:
+        return hashlib.sha256(clean_jd.encode("utf-8")).hexdigest()
+
+    def attach_bundle(self, bundle) -> None:
+        """
+        Reuse a precomputed JDBundle: predefined JDs then take their
+        embedding from the bundle instead of being encoded.
+        """
+        with self._context_lock:
+            self.bundle = bundle
+            self._bundle_tfidf = None
+
+    def _bundle_embedding(self, key: str) -> Optional[np.ndarray]:
+        """The bundle's embedding for a predefined JD, if it can stand in for encoding the JD"""
+        bundle = self.bundle
+        index = bundle.index_of(key) if bundle is not None else None
+        if index is None or self.method not in ('hybrid', 'embedding'):
+            return None
+        # JD embeddings are only reusable if they came from the same model
+        # and chunking; max-sim pooling needs per-chunk JD embeddings
+        if bundle.embedding_model != self.embedding_signature or self.chunk_pooling == "max":
+            return None
+        embedding = np.asarray(bundle.embeddings[index], dtype=np.float32)
+        embedding.flags.writeable = False
+        return embedding
+
+    def _library_tfidf(self) -> Tuple[TfidfVectorizer, sparse.csr_matrix]:
+        """TF-IDF model fitted once on every JD in the bundle, and its JD rows"""
+        bundle = self.bundle
+        with self._context_lock:
+            cached = self._bundle_tfidf
+        if cached is not None and cached[0] is bundle:
+            return cached[1], cached[2]
+
+        # Terms unique to one role are what tell roles apart, so no min_df
+        vectorizer = TfidfVectorizer(**{**self.tfidf_params, 'min_df': 1})
+        matrix = vectorizer.fit_transform(bundle.texts)
+        with self._context_lock:
+            self._bundle_tfidf = (bundle, vectorizer, matrix)
+        return vectorizer, matrix
+
+    @staticmethod
+    def _top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k best scores, best first; a partial sort keeps large libraries cheap"""
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def match_all_roles(
+        self,
+        resume: Union[str, Dict],
+        top_k: Optional[int] = None,
+        shortlist: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Score one resume against every role in the attached JD bundle.
+
+        The sweep over all roles takes one product per signal: the resume is
+        encoded once against the bundle's JD embeddings, and transformed once
+        by a TF-IDF model fitted on the whole JD library (built on first use).
+        The best `shortlist` roles (default 2 * top_k) are then re-scored with
+        TF-IDF fitted on the JD plus the resume, as get_similarity_score does,
+        so returned scores equal get_similarity_score for each role (with
+        max-sim pooling the bundle's pooled JD vectors are used instead).
+        top_k=None re-scores every role, one TF-IDF fit per role.
+        Returns (role, score) pairs, best first.
+        """
+        bundle = self.bundle
+        if bundle is None:
+            logger.error("match_all_roles needs a JD bundle (see attach_bundle)")
+            return []
+
+        try:
+            n_roles = len(bundle.roles)
+            top_k = n_roles if top_k is None else min(top_k, n_roles)
+            if top_k <= 0:
+                return []
+
+            embedding_scores = None
+            if self.method in ('hybrid', 'embedding'):
+                if bundle.embedding_model != self.embedding_signature:
+                    raise ValueError(f"JD bundle embeddings are from {bundle.embedding_model}")
+                embedding_scores = np.asarray(
+                    bundle.embeddings @ self._embedding_vectors([resume])[0], dtype=np.float64
                 )
-            
-            scores = cosine_similarity(self.jd_vector, resume_vectors).flatten()
+            if self.method == 'embedding':
+                # Bundle embeddings are exactly what the JD would encode to
+                return [(bundle.roles[i], float(round(embedding_scores[i], 4)))
+                        for i in self._top_indices(embedding_scores, top_k)]
+
+            vectorizer, library = self._library_tfidf()
+            approximate = cosine_similarity(library, self._tfidf_vectors(vectorizer, [resume])).ravel()
+            candidates = self._top_indices(
+                self._blend(embedding_scores, approximate) if embedding_scores is not None else approximate,
+                min(n_roles, max(top_k, 2 * top_k if shortlist is None else shortlist))
+            )
+
+            tfidf_scores = np.zeros(len(candidates))
+            for j, i in enumerate(candidates):
+                try:
+                    vectorizer, jd_vector = self._fit_tfidf(bundle.texts[i], [resume])
+                except ValueError:
+                    continue  # no shared vocabulary: this role scores 0, as per JD
+                resume_vector = self._tfidf_vectors(vectorizer, [resume])
+                tfidf_scores[j] = cosine_similarity(jd_vector, resume_vector)[0, 0]
+            tfidf_scores = np.round(tfidf_scores, 4)
+
+            if embedding_scores is not None:
+                scores = self._blend(embedding_scores[candidates], tfidf_scores)
+            else:
+                scores = tfidf_scores
+            return [(bundle.roles[candidates[j]], float(round(scores[j], 4)))
+                    for j in self._top_indices(scores, top_k)]
+
+        except Exception as e:
+            logger.error(f"Role matching failed: {str(e)}")
+            return []
+
+    def get_cached_context(self, jd_text: str) -> Optional[JDScoringContext]:
+        """
+        Cached context that can score any pool on its own, if there is one.
+        Only embedding-only matchers have such contexts: TF-IDF has to be
+        fitted on the resumes being scored (see build_context).
+        """
+        if self.method != 'embedding':
+            return None
+        clean_jd = self.clean_text(jd_text)
+        key = self._clean_key(clean_jd)
+        with self._context_lock:
+            context = self._context_cache.get(key)
+            if context is not None:
+                self._context_cache.move_to_end(key)
+        if context is None and self._bundle_embedding(key) is not None:
+            # Predefined JDs need no encoding, so their context is as good as cached
+            context = self._jd_context(key, clean_jd)
+        return context
+
+    def build_context(
+        self,
+        jd_text: str,
+        resume_texts: Optional[List[Union[str, Dict]]] = None
+    ) -> JDScoringContext:
+        """
+        Build the scoring context for a JD and a pool of resumes (plain text
+        or structured). The JD-side part (cleaned text, embedding) comes from
+        the LRU cache; the TF-IDF model is fitted on the JD plus resume_texts
+        on every call, so a score never depends on which pools the JD was
+        scored against before.
+        """
+        clean_jd = self.clean_text(jd_text)
+        context = self._jd_context(self._clean_key(clean_jd), clean_jd)
+        if self.method not in ('hybrid', 'tfidf'):
+            return context
+
+        try:
+            vectorizer, jd_vector = self._fit_tfidf(context.jd_text, resume_texts or [])
+        except Exception as e:
+            logger.error(f"TF-IDF fit error: {str(e)}")
+            return context
+        return replace(context, vectorizer=vectorizer, jd_vector=jd_vector)
+
+    def _jd_context(self, key: str, clean_jd: str) -> JDScoringContext:
+        """JD-side context for an already-cleaned JD, from the LRU cache or built on a miss"""
+        with self._context_lock:
+            context = self._context_cache.get(key)
+            if context is not None:
+                self._context_cache.move_to_end(key)
+                return context
+
+        if self.method in ('hybrid', 'embedding'):
+            try:
+                context = self._embedding_context(key, clean_jd)
+            except Exception as e:
+                logger.error(f"JD embedding error: {str(e)}")
+                # Not cached, so the next call retries
+                return JDScoringContext(key=key, jd_text=clean_jd)
+        else:
+            context = JDScoringContext(key=key, jd_text=clean_jd)
+
+        with self._context_lock:
+            # Another thread may have built the same context meanwhile; keep the first
+            context = self._context_cache.setdefault(key, context)
+            self._context_cache.move_to_end(key)
+            while len(self._context_cache) > self.context_cache_size:
+                self._context_cache.popitem(last=False)
+        return context
+
+    def _fit_tfidf(self, clean_jd: Union[str, List[str]], resume_texts: List[Union[str, Dict]]):
+        """
+        Fit a TF-IDF model on a cleaned JD (or several) plus resumes; returns
+        (vectorizer, JD rows)
+        """
+        clean_jds = [clean_jd] if isinstance(clean_jd, str) else list(clean_jd)
+        corpus = clean_jds + [
+            self.combine_structured_resume(r) if isinstance(r, dict) else self.clean_text(r)
+            for r in resume_texts
+        ]
+        params = dict(self.tfidf_params)
+        if isinstance(params.get('min_df'), int) and params['min_df'] > len(corpus):
+            # A JD-only corpus cannot meet a document-count threshold
+            params['min_df'] = 1
+        vectorizer = TfidfVectorizer(**params)
+        jd_rows = vectorizer.fit_transform(corpus)[:len(clean_jds)]
+        return vectorizer, jd_rows
+
+    def _as_context(
+        self,
+        jd: Union[str, JDScoringContext],
+        resume_texts: List[Union[str, Dict]]
+    ) -> JDScoringContext:
+        if isinstance(jd, JDScoringContext):
+            return jd
+        return self.build_context(jd, resume_texts)
+
+    def compute_tfidf_similarity(
+        self,
+        jd: Union[str, JDScoringContext],
+        resume_texts: List[Union[str, Dict]]
+    ) -> List[float]:
+        """TF-IDF similarity against the JD's fitted scoring context"""
+        try:
+            context = self._as_context(jd, resume_texts)
+            if context.vectorizer is None:
+                raise ValueError("scoring context has no fitted TF-IDF model")
+
+            resume_vectors = self._tfidf_vectors(context.vectorizer, resume_texts)
+            scores = cosine_similarity(context.jd_vector, resume_vectors).flatten()
             return [float(round(score, 4)) for score in scores]
         except Exception as e:
             logger.error(f"TF-IDF error: {str(e)}")
             return [0.0] * len(resume_texts)
 
-    def compute_embedding_similarity(self, jd_text: str, resume_texts: List[str]) -> List[float]:
-        """Optimized embedding computation with chunking"""
+    def _encode(self, documents: List[str]) -> np.ndarray:
+        """Encode cleaned documents into L2-normalized embeddings, reusing stored vectors"""
+        if self.embedding_store is None or not documents:
+            return self._encode_uncached(documents)
+
+        keys = [EmbeddingStore.text_key(d) for d in documents]
+        vectors = self.embedding_store.get_many(keys)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = self._encode_uncached([documents[i] for i in missing])
+            self.embedding_store.add([keys[i] for i in missing], encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def _token_lengths(self, documents: List[str]) -> List[int]:
+        """
+        Encoder input length of each document (after truncation), from one
+        tokenizer call. encode() tokenizes each batch again: SentenceTransformer
+        takes text, not features, and its own tokenization (stripping,
+        lower-casing, padding to the batch's longest input) has to apply.
+        This extra pass is unpadded, with a fast tokenizer, and small next to
+        the forward passes it keeps short.
+        """
+        max_length = getattr(self.embedding_model, "max_seq_length", None) or 512
+        tokenizer = getattr(self.embedding_model, "tokenizer", None)
+        if tokenizer is None:
+            # Rough fallback: ~4 characters per token
+            return [min(max_length, len(d) // 4 + 2) for d in documents]
+        encoded = tokenizer(documents, truncation=True, max_length=max_length, verbose=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _token_batches(self, documents: List[str]) -> List[List[int]]:
+        """
+        Group document indices into batches of similar token length. A batch
+        grows until its padded size (documents x longest document) would exceed
+        the token budget, so short resumes are not padded up to long ones.
+        """
+        lengths = self._token_lengths(documents)
+        batches, batch, longest = [], [], 0
+        for i in sorted(range(len(documents)), key=lengths.__getitem__):
+            longest_if_added = max(longest, lengths[i])
+            if batch and (longest_if_added * (len(batch) + 1) > self.token_budget
+                          or len(batch) >= self.max_batch_size):
+                batches.append(batch)
+                batch, longest_if_added = [], lengths[i]
+            batch.append(i)
+            longest = longest_if_added
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _encode_uncached(self, documents: List[str]) -> np.ndarray:
+        if not documents:
+            return np.zeros((0, self.embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+        embeddings = None
+        for batch in self._token_batches(documents):
+            batch_emb = self.embedding_model.encode(
+                [documents[i] for i in batch],
+                batch_size=len(batch),
+                device=self.device,
+                show_progress_bar=False,
+                convert_to_tensor=True
+            ).cpu().numpy()
+            if embeddings is None:
+                embeddings = np.empty((len(documents), batch_emb.shape[1]), dtype=np.float32)
+            # Scatter back so callers see the original document order
+            embeddings[batch] = batch_emb
+
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    def compute_embedding_similarity(
+        self,
+        jd: Union[str, JDScoringContext],
+        resume_texts: List[Union[str, Dict]]
+    ) -> List[float]:
+        """Embedding similarity against the JD's scoring context"""
         try:
-            documents = [self.clean_text(jd_text)] + [self.clean_text(r) for r in resume_texts]
-            
-            # Dynamic batch sizing
-            avg_len = sum(len(d) for d in documents) / len(documents)
-            batch_size = max(1, min(64, int(4000 / avg_len)))
-            
-            embeddings = []
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i:i + batch_size]
-                batch_emb = self.embedding_model.encode(
-                    batch,
-                    device=self.device,
-                    show_progress_bar=False,
-                    convert_to_tensor=True
-                )
-                embeddings.append(batch_emb)
-            
-            embeddings = torch.cat(embeddings).cpu().numpy()
-            embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
-            
-            return cosine_similarity(embeddings[0:1], embeddings[1:]).flatten().tolist()
+            context = self._as_context(jd, resume_texts)
+            if context.jd_embedding is None:
+                raise ValueError("scoring context has no JD embedding")
+
+            if self.chunk_pooling == "max" and context.jd_chunks is not None:
+                return self._maxsim_scores([context.jd_chunks], resume_texts)[0].tolist()
+
+            embeddings = self._embedding_vectors(resume_texts)
+            return (embeddings @ context.jd_embedding).tolist()
         except Exception as e:
             logger.error(f"Embedding error: {str(e)}")
             return [0.0] * len(resume_texts)
 
+    def score_matrix(
+        self,
+        jd_texts: List[str],
+        resumes: List[Union[str, Dict]]
+    ) -> np.ndarray:
+        """
+        Score every resume against every JD; returns a (n_jds, n_resumes)
+        array. Resumes are encoded once and JD embeddings come from the LRU
+        cache or the bundle, so the embedding scores take one matrix product
+        and equal get_similarity_score. TF-IDF is fitted once on the pool plus
+        every JD and scored with one sparse product; that shared vocabulary
+        and IDF make TF-IDF scores differ slightly from scoring each JD alone
+        (get_similarity_score / process_batch fit on one JD plus the pool).
+        """
+        scores = np.zeros((len(jd_texts), len(resumes)), dtype=np.float32)
+        if not jd_texts or not resumes:
+            return scores
+
+        try:
+            clean_jds = [self.clean_text(jd) for jd in jd_texts]
+
+            if self.method in ('hybrid', 'tfidf'):
+                try:
+                    vectorizer, jd_rows = self._fit_tfidf(clean_jds, resumes)
+                    tfidf_scores = np.round(
+                        cosine_similarity(jd_rows, self._tfidf_vectors(vectorizer, resumes)), 4
+                    )
+                except ValueError as e:
+                    # No vocabulary survived pruning: TF-IDF scores 0, as per JD
+                    logger.error(f"TF-IDF fit error: {str(e)}")
+                    tfidf_scores = np.zeros((len(jd_texts), len(resumes)))
+
+            if self.method in ('hybrid', 'embedding'):
+                contexts = [self._jd_context(self._clean_key(c), c) for c in clean_jds]
+                if self.chunk_pooling == "max" and all(c.jd_chunks is not None for c in contexts):
+                    embedding_scores = self._maxsim_scores([c.jd_chunks for c in contexts], resumes)
+                else:
+                    resume_embeddings = self._embedding_vectors(resumes)
+                    # A JD whose embedding failed scores 0, as in compute_embedding_similarity
+                    jd_embeddings = np.vstack([
+                        c.jd_embedding if c.jd_embedding is not None
+                        else np.zeros(resume_embeddings.shape[1], dtype=np.float32)
+                        for c in contexts
+                    ])
+                    embedding_scores = jd_embeddings @ resume_embeddings.T
+
+            if self.method == 'hybrid':
+                scores = 0.6 * embedding_scores + 0.4 * tfidf_scores
+            else:
+                scores = embedding_scores if self.method == 'embedding' else tfidf_scores
+            return np.round(scores, 4)
+
+        except Exception as e:
+            logger.error(f"Score matrix failed: {str(e)}")
+            return scores
+
+    def _tier_matcher(self, tier: str) -> "ResumeMatcher":
+        """Embedding matcher for a model tier (fast/balanced/accurate), loaded on first use"""
+        if self.embedding_models.get(tier) == self.embedding_model_name and self.method in ('hybrid', 'embedding'):
+            return self
+        with self._context_lock:
+            matcher = self._tier_matchers.get(tier)
+        if matcher is None:
+            matcher = ResumeMatcher(method="embedding", embedding_model=tier, **self._tier_options)
+            if matcher.method != "embedding":
+                raise RuntimeError(f"could not load the '{tier}' embedding model")
+            with self._context_lock:
+                matcher = self._tier_matchers.setdefault(tier, matcher)
+        return matcher
+
+    def _embedding_context(self, key: str, clean_jd: str) -> JDScoringContext:
+        """Embedding-only scoring context for an already-cleaned JD"""
+        jd_chunks = None
+        if self.chunk_pooling == "max":
+            jd_chunks, _ = self._encode_chunks([clean_jd])
+            jd_chunks.flags.writeable = False
+        # Predefined JDs reuse the bundle's embedding instead of encoding
+        jd_embedding = self._bundle_embedding(key)
+        if jd_embedding is None:
+            jd_embedding = self._embed_documents([clean_jd])[0]
+            jd_embedding.flags.writeable = False
+        return JDScoringContext(key=key, jd_text=clean_jd, jd_embedding=jd_embedding, jd_chunks=jd_chunks)
+
+    @staticmethod
+    def _blend(embedding_scores: np.ndarray, tfidf_scores: Optional[np.ndarray]) -> np.ndarray:
+        if tfidf_scores is None:
+            return embedding_scores
+        return 0.6 * embedding_scores + 0.4 * tfidf_scores
+
+    def cascade_rank(
+        self,
+        jd_text: Union[str, JDScoringContext],
+        resumes: List[Union[str, Dict]],
+        top_k: int = 10,
+        margin: Optional[int] = None,
+        prefilter_model: str = "fast",
+        rerank_model: str = "balanced",
+        measure_recall: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Two-stage ranking for large applicant pools.
+
+        Stage 1 scores every resume with TF-IDF (when this matcher has it) and
+        the prefilter_model tier; stage 2 re-scores only the best
+        top_k + margin (margin defaults to top_k) with rerank_model, blending
+        with the same TF-IDF scores. Returns:
+            "scores": (index, score) pairs in final order: re-ranked resumes
+                first, then the rest by their stage-1 score
+            "shortlist": indices that were re-ranked
+            "timings": seconds spent per stage
+            "recall_at_k": with measure_recall, the share of the top_k from
+                re-ranking every resume that the cascade also puts in its
+                top_k (this runs the expensive model on everything)
+        """
+        timings = {}
+        started = time.perf_counter()
+        result = {"scores": [], "shortlist": [], "timings": timings, "recall_at_k": None}
+        if not jd_text or not resumes:
+            return result
+
+        # Tier matchers get the JD already cleaned, never cleaned a second time
+        if isinstance(jd_text, JDScoringContext):
+            key, clean_jd = jd_text.key, jd_text.jd_text
+        else:
+            clean_jd = self.clean_text(jd_text)
+            key = self._clean_key(clean_jd)
+        margin = top_k if margin is None else margin
+
+        tfidf_scores = None
+        if self.method in ('hybrid', 'tfidf'):
+            context = self._as_context(jd_text, resumes)
+            tfidf_scores = np.array(self.compute_tfidf_similarity(context, resumes))
+            timings["tfidf"] = time.perf_counter() - started
+
+        stage_start = time.perf_counter()
+        prefilter = self._tier_matcher(prefilter_model)
+        prefilter_context = prefilter._jd_context(key, clean_jd)
+        stage1 = self._blend(np.array(prefilter.compute_embedding_similarity(prefilter_context, resumes)), tfidf_scores)
+        timings["prefilter"] = time.perf_counter() - stage_start
+
+        order = np.argsort(-stage1, kind="stable")
+        shortlist = order[:min(len(resumes), top_k + margin)]
+
+        stage_start = time.perf_counter()
+        reranker = self._tier_matcher(rerank_model)
+        rerank_context = reranker._jd_context(key, clean_jd)
+        final = self._blend(
+            np.array(reranker.compute_embedding_similarity(rerank_context, [resumes[i] for i in shortlist])),
+            None if tfidf_scores is None else tfidf_scores[shortlist]
+        )
+        timings["rerank"] = time.perf_counter() - stage_start
+
+        reranked = shortlist[np.argsort(-final, kind="stable")]
+        final_scores = dict(zip(shortlist.tolist(), final.tolist()))
+        result["scores"] = (
+            [(int(i), float(round(final_scores[i], 4))) for i in reranked.tolist()]
+            + [(int(i), float(round(stage1[i], 4))) for i in order[len(shortlist):].tolist()]
+        )
+        result["shortlist"] = reranked.tolist()
+
+        if measure_recall:
+            stage_start = time.perf_counter()
+            reference = self._blend(np.array(reranker.compute_embedding_similarity(rerank_context, resumes)), tfidf_scores)
+            expected = set(np.argsort(-reference, kind="stable")[:top_k].tolist())
+            found = {i for i, _ in result["scores"][:top_k]}
+            result["recall_at_k"] = len(expected & found) / max(1, len(expected))
+            timings["reference"] = time.perf_counter() - stage_start
+
+        timings["total"] = time.perf_counter() - started
+        logger.info(
+            "Cascade: %d resumes, %d re-ranked; %s",
+            len(resumes), len(shortlist),
+            ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+        )
+        return result
+
+    def skill_vocabulary(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        """
+        SKILL_VOCABULARY and its embedding matrix, encoded once per matcher.
+        The matrix is None without an embedding model.
+        """
+        with self._context_lock:
+            if self._skill_vocabulary is not None:
+                return self._skill_vocabulary
+
+        matrix = self._encode(SKILL_VOCABULARY) if self.method in ('hybrid', 'embedding') else None
+        with self._context_lock:
+            self._skill_vocabulary = (SKILL_VOCABULARY, matrix)
+        return self._skill_vocabulary
+
+    @staticmethod
+    def skill_phrases(text: str) -> List[str]:
+        """Vocabulary skills mentioned in text, most mentioned first (ties: first mention first)"""
+        if not text:
+            return []
+        counts = Counter(match.group(0) for match in _SKILL_PATTERN.finditer(text.lower()))
+        return [phrase for phrase, _ in counts.most_common()]
+
+    def match_skills(
+        self,
+        jd_phrases: List[str],
+        resume_phrases: List[str],
+        skill_likeness: float = 0.8
+    ) -> Dict[str, Any]:
+        """
+        Synonym-aware skill coverage of a JD by a resume.
+
+        Vocabulary phrases (see skill_phrases) take their rows from the
+        precomputed skill matrix; any other phrases are encoded in one batch,
+        and an unknown JD phrase only counts as a skill if it is within
+        skill_likeness of the vocabulary. One (jd x resume) similarity product
+        then decides coverage: a JD skill is matched by its most similar
+        resume phrase when that similarity reaches min_skill_match. Without
+        embeddings, only exact vocabulary matches count.
+
+        Returns "jd_skills", "matched" (jd skill, resume phrase, similarity),
+        "missing" (in jd_phrases order, i.e. by JD relevance for
+        skill_phrases output) and "coverage" (matched share of JD skills).
+        """
+        jd_phrases = list(dict.fromkeys(p.lower() for p in jd_phrases if p))
+        resume_phrases = list(dict.fromkeys(p.lower() for p in resume_phrases if p))
+        result = {"jd_skills": [], "matched": [], "missing": [], "coverage": 0.0}
+        if not jd_phrases:
+            return result
+
+        vocabulary, vocabulary_matrix = self.skill_vocabulary()
+        rows = {phrase: i for i, phrase in enumerate(vocabulary)}
+        if vocabulary_matrix is None:
+            resume_set = set(resume_phrases)
+            jd_skills = [p for p in jd_phrases if p in rows]
+            result["jd_skills"] = jd_skills
+            result["matched"] = [(p, p, 1.0) for p in jd_skills if p in resume_set]
+            result["missing"] = [p for p in jd_skills if p not in resume_set]
+        else:
+            unknown = [p for p in dict.fromkeys(jd_phrases + resume_phrases) if p not in rows]
+            extra = self._encode(unknown) if unknown else None
+            extra_rows = {phrase: i for i, phrase in enumerate(unknown)}
+
+            def embed(phrases):
+                if not phrases:
+                    return np.zeros((0, vocabulary_matrix.shape[1]), dtype=np.float32)
+                return np.vstack([
+                    vocabulary_matrix[rows[p]] if p in rows else extra[extra_rows[p]]
+                    for p in phrases
+                ])
+
+            jd_embeddings = embed(jd_phrases)
+            is_skill = np.array([p in rows for p in jd_phrases])
+            if unknown:
+                likeness = (jd_embeddings @ vocabulary_matrix.T).max(axis=1)
+                is_skill |= likeness >= skill_likeness
+            jd_skills = [p for p, keep in zip(jd_phrases, is_skill) if keep]
+            result["jd_skills"] = jd_skills
+            if not resume_phrases:
+                result["missing"] = jd_skills
+            elif jd_skills:
+                coverage = jd_embeddings[is_skill] @ embed(resume_phrases).T
+                best = coverage.argmax(axis=1)
+                best_scores = coverage[np.arange(len(jd_skills)), best]
+                for skill, j, score in zip(jd_skills, best, best_scores):
+                    if score >= self.min_skill_match:
+                        result["matched"].append((skill, resume_phrases[j], float(round(score, 4))))
+                    else:
+                        result["missing"].append(skill)
+
+        if result["jd_skills"]:
+            result["coverage"] = len(result["matched"]) / len(result["jd_skills"])
+        return result
+
     def get_similarity_score(
         self,
-        jd_text: str,
+        jd_text: Union[str, JDScoringContext],
         resumes: List[Union[str, Dict]],
         mode: str = "structured"
     ) -> List[Tuple[int, float]]:
-        """Calculate similarity scores between JD and resumes"""
+        """
+        Calculate similarity scores between JD and resumes.
+        jd_text may be raw JD text or a prebuilt JDScoringContext.
+        """
         if not jd_text or not resumes:
             return []
         
         try:
-            processed_resumes = [
-                self.combine_structured_resume(r) if isinstance(r, dict) 
-                else self.clean_text(r) 
-                for r in resumes
-            ]
+            context = self._as_context(jd_text, resumes)
             
-            # Calculate scores
+            # Calculate scores; structured resumes are scored from weighted section vectors
             if self.method in ('hybrid', 'tfidf'):
-                tfidf_scores = self.compute_tfidf_similarity(jd_text, processed_resumes)
+                tfidf_scores = self.compute_tfidf_similarity(context, resumes)
             
             if self.method in ('hybrid', 'embedding'):
-                embedding_scores = self.compute_embedding_similarity(jd_text, processed_resumes)
+                embedding_scores = self.compute_embedding_similarity(context, resumes)
             
             if self.method == 'hybrid':
                 scores = [0.6 * emb + 0.4 * tf for emb, tf in zip(embedding_scores, tfidf_scores)]
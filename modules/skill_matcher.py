@@ -0,0 +1,159 @@
+import re
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Set
+from modules.text_constants import SKILL_KEYWORDS, SKILL_CATEGORIES
+
+
+def _first_literal(pattern: str) -> Optional[str]:
+    """Case-folded character every match of pattern starts with, or None if it can vary"""
+    if "|" in pattern or not pattern[:1].isalnum() or pattern[1:2] in ("?", "*", "{"):
+        return None
+    return pattern[0].casefold()
+
+
+def _compile_alternation(entries):
+    """
+    Compile (pattern, label) pairs into one case-insensitive regex that finds
+    every position where some pattern matches, plus anchored per-pattern
+    regexes grouped by the character their matches start with, so only the
+    few patterns that can match at a position are tried there.
+    Returns (regex, {first character: candidates}, fallback candidates, label count).
+    """
+    entries = list(entries)
+    if not entries:
+        return None, {}, [], 0
+    regex = re.compile(r"\b(?:" + "|".join(f"(?:{p})" for p, _ in entries) + r")\b", re.IGNORECASE)
+    by_first, fallback = {}, []
+    for p, label in entries:
+        candidate = (re.compile(r"\b(?:" + p + r")\b", re.IGNORECASE), label)
+        first = _first_literal(p)
+        if first is None:
+            fallback.append(candidate)
+        else:
+            by_first.setdefault(first, []).append(candidate)
+    # Patterns without a fixed first character are candidates everywhere
+    by_first = {first: candidates + fallback for first, candidates in by_first.items()}
+    return regex, by_first, fallback, len({label for _, label in entries})
+
+
+def _scan(compiled, text: str) -> Set[str]:
+    """
+    Collect every label matched in text, same as one re.search per pattern.
+    The combined regex visits each position where any pattern matches; there
+    the patterns starting with that character whose label is still missing
+    are tried, so "C" and "C++" starting at the same offset are both reported.
+    """
+    regex, by_first, fallback, n_labels = compiled
+    found = set()
+    if regex is None or not text:
+        return found
+    pos = 0
+    search = regex.search
+    while len(found) < n_labels:
+        match = search(text, pos)
+        if match is None:
+            break
+        start = match.start()
+        for pattern, label in by_first.get(text[start].casefold()[:1], fallback):
+            if label not in found and pattern.match(text, start):
+                found.add(label)
+        # Resume right after the match start so overlapping mentions such as
+        # "js" inside "node.js" are still seen
+        pos = start + 1
+    return found
+
+
+class SkillMatcher:
+    """
+    Skill dictionary compiled once into a single alternation regex.
+    One scan of a section returns every skill it mentions, instead of one
+    re.search per (skill, pattern) pair.
+    """
+
+    def __init__(
+        self,
+        skill_keywords: Optional[Dict[str, List[str]]] = None,
+        skill_categories: Optional[Dict[str, List[str]]] = None
+    ):
+        skill_keywords = SKILL_KEYWORDS if skill_keywords is None else skill_keywords
+        skill_categories = SKILL_CATEGORIES if skill_categories is None else skill_categories
+
+        self.skills = list(skill_keywords)
+        self.categories = list(skill_categories)
+        # Bit positions for skill bitsets: one bit per skill, packed in uint64 words
+        self._bit_index = {skill.lower(): i for i, skill in enumerate(self.skills)}
+        self.n_words = max(1, (len(self.skills) + 63) // 64)
+        self._skill_scanner = _compile_alternation(
+            (pattern, skill) for skill, patterns in skill_keywords.items() for pattern in patterns
+        )
+        self._category_scanner = _compile_alternation(
+            (pattern, category) for category, patterns in skill_categories.items() for pattern in patterns
+        )
+        self._skill_categories = {}
+
+    def find_skills(self, text: str) -> Set[str]:
+        return _scan(self._skill_scanner, text)
+
+    def categories_for(self, skill: str) -> Set[str]:
+        if skill not in self._skill_categories:
+            self._skill_categories[skill] = _scan(self._category_scanner, skill.lower())
+        return self._skill_categories[skill]
+
+    def find_skills_with_categories(self, text: str) -> Dict[str, Set[str]]:
+        return {skill: self.categories_for(skill) for skill in self.find_skills(text)}
+
+    def categorize(self, skills: Iterable[str]) -> Dict[str, List[str]]:
+        """Group skills by category, keeping the category order of the dictionary"""
+        grouped = {category: set() for category in self.categories}
+        for skill in skills:
+            for category in self.categories_for(skill):
+                grouped[category].add(skill)
+        return {category: sorted(found) for category, found in grouped.items() if found}
+
+    def bitset(self, skills: Iterable[str]) -> np.ndarray:
+        """Pack skill names (case-insensitive) into a uint64 bitset over the skill vocabulary"""
+        words = np.zeros(self.n_words, dtype=np.uint64)
+        for skill in skills:
+            bit = self._bit_index.get(skill.lower())
+            if bit is None:
+                raise ValueError(f"Unknown skill: {skill}")
+            words[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return words
+
+    def bitset_matrix(self, skill_lists: Iterable[Iterable[str]]) -> np.ndarray:
+        """(n_resumes, n_words) bitset matrix, one row per list of skills"""
+        skill_lists = list(skill_lists)
+        matrix = np.zeros((len(skill_lists), self.n_words), dtype=np.uint64)
+        for row, skills in enumerate(skill_lists):
+            matrix[row] = self.bitset(skills)
+        return matrix
+
+    def skills_from_bitset(self, words: np.ndarray) -> List[str]:
+        return [
+            skill for i, skill in enumerate(self.skills)
+            if int(words[i // 64]) >> (i % 64) & 1
+        ]
+
+
+def filter_bitsets(
+    matrix: np.ndarray,
+    required: Optional[np.ndarray] = None,
+    excluded: Optional[np.ndarray] = None,
+    any_of: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Boolean mask over the rows of a skill bitset matrix: rows that have every
+    required skill, none of the excluded ones and at least one of any_of.
+    Empty or None masks are ignored.
+    """
+    keep = np.ones(len(matrix), dtype=bool)
+    if required is not None and required.any():
+        keep &= ((matrix & required) == required).all(axis=1)
+    if excluded is not None and excluded.any():
+        keep &= ~(matrix & excluded).any(axis=1)
+    if any_of is not None and any_of.any():
+        keep &= (matrix & any_of).any(axis=1)
+    return keep
+
+
+skill_matcher = SkillMatcher()
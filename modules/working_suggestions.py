@@ -1,7 +1,7 @@
 # Fixed suggestions system that works with the existing modules
 import re
 import logging
-from typing import Dict, List, Set, Any
+from typing import Dict, List, Optional, Set, Any
 from collections import defaultdict
 from modules.text_constants import SKILL_SYNONYMS, IMPACT_VERBS, QUANTIFIABLE_METRICS
 
@@ -32,7 +32,12 @@ def extract_jd_keywords(jd_text: str) -> Set[str]:
     
     return keywords
 
-def analyze_section_quality(section_name: str, content: str, jd_keywords: Set[str]) -> Dict[str, Any]:
+def analyze_section_quality(
+    section_name: str,
+    content: str,
+    jd_keywords: Set[str],
+    skill_match: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """Analyze individual section quality"""
     
     analysis = {
@@ -58,7 +63,7 @@ def analyze_section_quality(section_name: str, content: str, jd_keywords: Set[st
     
     # Section-specific analysis
     if section_name.lower() in ["skills", "technical skills", "key skills"]:
-        return analyze_skills_section(content, jd_keywords, analysis)
+        return analyze_skills_section(content, jd_keywords, analysis, skill_match)
     elif section_name.lower() in ["experience", "work experience", "internships", "employment"]:
         return analyze_experience_section(content, jd_keywords, analysis)
     elif section_name.lower() in ["projects", "personal projects", "academic projects"]:
@@ -72,8 +77,17 @@ def analyze_section_quality(section_name: str, content: str, jd_keywords: Set[st
     
     return analysis
 
-def analyze_skills_section(content: str, jd_keywords: Set[str], analysis: Dict) -> Dict:
-    """Detailed skills section analysis"""
+def analyze_skills_section(
+    content: str,
+    jd_keywords: Set[str],
+    analysis: Dict,
+    skill_match: Optional[Dict[str, Any]] = None
+) -> Dict:
+    """
+    Detailed skills section analysis. skill_match (from
+    ResumeMatcher.match_skills) replaces the substring check for missing JD
+    skills with semantic, synonym-aware coverage.
+    """
     suggestions = []
     issues = []
     strengths = []
@@ -89,11 +103,18 @@ def analyze_skills_section(content: str, jd_keywords: Set[str], analysis: Dict)
     
     # Check for missing JD keywords
     missing_skills = []
-    for keyword in list(jd_keywords)[:5]:  # Check top 5 JD keywords
-        if keyword not in content.lower():
-            # Check if it's a technical skill
-            if any(keyword in synonyms for synonyms in SKILL_SYNONYMS.values()):
-                missing_skills.append(keyword)
+    if skill_match is not None:
+        missing_skills = list(skill_match["missing"])
+        if skill_match["matched"]:
+            strengths.append(
+                f"Covers {len(skill_match['matched'])} of {len(skill_match['jd_skills'])} JD skills"
+            )
+    else:
+        for keyword in list(jd_keywords)[:5]:  # Check top 5 JD keywords
+            if keyword not in content.lower():
+                # Check if it's a technical skill
+                if any(keyword in synonyms for synonyms in SKILL_SYNONYMS.values()):
+                    missing_skills.append(keyword)
     
     if missing_skills:
         suggestions.append(f"Consider adding these JD-relevant skills: {', '.join(missing_skills[:3])}")
@@ -233,14 +254,23 @@ def analyze_education_section(content: str, analysis: Dict) -> Dict:
     
     return analysis
 
-def generate_enhanced_suggestions(resume_data: Dict, jd_text: str) -> Dict[str, Any]:
-    """Generate comprehensive, personalized suggestions - FIXED VERSION"""
+def generate_enhanced_suggestions(
+    resume_data: Dict,
+    jd_text: str,
+    jd_keywords: Optional[Set[str]] = None,
+    matcher=None
+) -> Dict[str, Any]:
+    """
+    Generate comprehensive, personalized suggestions - FIXED VERSION.
+    With a ResumeMatcher, missing skills come from its semantic skill matching.
+    """
     
     try:
         logger.info("Starting personalized suggestion generation")
         
-        # Extract JD keywords
-        jd_keywords = extract_jd_keywords(jd_text)
+        # Extract JD keywords (predefined roles pass them precomputed)
+        if jd_keywords is None:
+            jd_keywords = extract_jd_keywords(jd_text)
         logger.info(f"Extracted {len(jd_keywords)} keywords from JD")
         
         # Initialize results structure
@@ -263,6 +293,7 @@ def generate_enhanced_suggestions(resume_data: Dict, jd_text: str) -> Dict[str,
         section_weights = {"skills": 0.3, "experience": 0.25, "projects": 0.25, "education": 0.2}
         sections_analyzed = 0
         
+        section_contents = {}
         for section_name, content in resume_data.items():
             # Skip metadata sections
             if section_name in ['sections', 'metadata', 'global_entities', 'section_entities']:
@@ -277,11 +308,24 @@ def generate_enhanced_suggestions(resume_data: Dict, jd_text: str) -> Dict[str,
                 content_str = content
             else:
                 continue
-            
+            section_contents[section_name] = content_str
+
+        # Semantic skill coverage of the JD by the whole resume, computed once
+        skill_match = None
+        if matcher is not None:
+            # Vocabulary skills in the JD, most mentioned first, so missing
+            # skills come out in order of JD relevance
+            jd_phrases = matcher.skill_phrases(jd_text) if jd_text else sorted(jd_keywords)
+            resume_phrases = matcher.skill_phrases(' '.join(section_contents.values()))
+            skill_match = matcher.match_skills(jd_phrases, resume_phrases)
+            results["skill_match"] = skill_match
+            logger.info(f"Matched {len(skill_match['matched'])} of {len(skill_match['jd_skills'])} JD skills")
+
+        for section_name, content_str in section_contents.items():
             # Only analyze if content exists
             if content_str and content_str.strip():
                 logger.info(f"Analyzing section: {section_name}")
-                analysis = analyze_section_quality(section_name, content_str, jd_keywords)
+                analysis = analyze_section_quality(section_name, content_str, jd_keywords, skill_match)
                 results["section_scores"][section_name] = analysis
                 
                 # Calculate weighted score
@@ -392,10 +436,15 @@ def generate_personalized_advice(results: Dict, jd_keywords: Set[str]) -> List[s
     return advice
 
 # Main function for integration
-def get_enhanced_suggestions(resume_data: Dict, jd_text: str = "") -> Dict[str, Any]:
+def get_enhanced_suggestions(
+    resume_data: Dict,
+    jd_text: str = "",
+    jd_keywords: Optional[Set[str]] = None,
+    matcher=None
+) -> Dict[str, Any]:
     """Main function to get enhanced, personalized suggestions - FIXED VERSION"""
     try:
-        return generate_enhanced_suggestions(resume_data, jd_text)
+        return generate_enhanced_suggestions(resume_data, jd_text, jd_keywords, matcher)
     except Exception as e:
         logger.error(f"Error in get_enhanced_suggestions: {e}")
         return {
@@ -0,0 +1,76 @@
+"""
+Compare candidate-index rankings with float16 and int8 embedding storage
+against float32, using the predefined JDs as queries.
+
+For each compact dtype, reports bytes per candidate for the searched matrix,
+top-k recall against the float32 ranking with and without the exact float32
+rescoring pass, and the mean absolute score error before rescoring.
+
+Usage:
+    python scripts/compare_embedding_precision.py [resume_dir] [top_k]
+"""
+import os
+import sys
+import glob
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from modules import parser, similarity, jd_handler
+from modules.candidate_index import CandidateIndex
+from modules.resume_ranker import _extract_metadata
+
+
+def ranking(index: CandidateIndex, jd_text: str, top_k: int):
+    return [(row["id"], row["score"]) for row in index.query(jd_text, top_k=top_k)]
+
+
+def main():
+    resume_dir = sys.argv[1] if len(sys.argv) > 1 else "sample_resumes"
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    paths = sorted(glob.glob(os.path.join(resume_dir, "*.pdf")) +
+                   glob.glob(os.path.join(resume_dir, "*.docx")))
+    records = [_extract_metadata(parser.extract_text(p), p) for p in paths]
+    records = [r for r in records if r["text"]]
+    if not records:
+        print(f"No readable resumes found in {resume_dir}")
+        return
+    jds = list(jd_handler.load_predefined_jds().values())
+
+    # One matcher for every index: with the embedding cache each text is encoded once
+    matcher = similarity.ResumeMatcher(method="hybrid")
+    with tempfile.TemporaryDirectory() as workdir:
+        reference = CandidateIndex(os.path.join(workdir, "float32"), matcher=matcher)
+        reference.add(records)
+        expected = [ranking(reference, jd, top_k) for jd in jds]
+
+        print(f"Candidates: {len(records)}   Queries: {len(jds)}   k={top_k}")
+        print(f"{'dtype':<8} {'bytes/cand':>11} {'recall@k':>10} {'+rescore':>10} {'score MAE':>10}")
+        print(f"{'float32':<8} {reference.dim * 4:>11} {1.0:>10.3f} {1.0:>10.3f} {0.0:>10.4f}")
+
+        for dtype in ("float16", "int8"):
+            directory = os.path.join(workdir, dtype)
+            approximate = CandidateIndex(directory, matcher=matcher, embedding_dtype=dtype, rescore=0)
+            approximate.add(records)
+            rescored = CandidateIndex(directory, matcher=matcher, embedding_dtype=dtype)
+
+            recall, recall_rescored, errors = [], [], []
+            for jd, reference_rows in zip(jds, expected):
+                reference_ids = {key for key, _ in reference_rows}
+                approximate_rows = ranking(approximate, jd, top_k)
+                recall.append(len(reference_ids & {key for key, _ in approximate_rows}) / len(reference_ids))
+                rescored_ids = {key for key, _ in ranking(rescored, jd, top_k)}
+                recall_rescored.append(len(reference_ids & rescored_ids) / len(reference_ids))
+
+                # Score error on the float32 top-k, before any rescoring
+                approximate_scores = dict(ranking(approximate, jd, len(records)))
+                errors.extend(abs(score - approximate_scores[key]) for key, score in reference_rows)
+
+            itemsize = np.dtype(dtype).itemsize
+            print(f"{dtype:<8} {approximate.dim * itemsize:>11} {np.mean(recall):>10.3f} "
+                  f"{np.mean(recall_rescored):>10.3f} {np.mean(errors):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare the fp32 and dynamic-int8 NER models on the bundled sample resumes.
+
+Reports per-document latency, serialized model size and how closely the
+int8 entities agree with the fp32 ones (precision/recall/F1 on
+(label, start, end) spans, using fp32 as the reference).
+
+Usage:
+    python scripts/compare_ner_quantization.py [resume_dir]
+"""
+import io
+import os
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from modules import parser
+
+
+def model_size_mb(ner: parser.ResumeNER) -> float:
+    buffer = io.BytesIO()
+    torch.save(ner.ner_pipeline.model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def run(ner: parser.ResumeNER, texts):
+    ner._load_model()
+    ner.extract_entities(texts[0])  # warm-up
+    results, timings = [], []
+    for text in texts:
+        start = time.perf_counter()
+        results.append(ner.extract_entities(text))
+        timings.append(time.perf_counter() - start)
+    return results, timings
+
+
+def spans(result):
+    return {(e["entity_group"], e.get("start"), e.get("end")) for e in result["raw"]}
+
+
+def main():
+    resume_dir = sys.argv[1] if len(sys.argv) > 1 else "sample_resumes"
+    paths = sorted(glob.glob(os.path.join(resume_dir, "*.pdf")) +
+                   glob.glob(os.path.join(resume_dir, "*.docx")))
+    texts = [parser.extract_text(p, use_cache=False) for p in paths]
+    texts = [t for t in texts if t]
+    if not texts:
+        print(f"No readable resumes found in {resume_dir}")
+        return
+
+    torch.set_num_threads(max(1, os.cpu_count() or 1))
+    fp32 = parser.ResumeNER(quantize=False)
+    int8 = parser.ResumeNER(quantize=True)
+    fp32_results, fp32_times = run(fp32, texts)
+    int8_results, int8_times = run(int8, texts)
+
+    tp = fp = fn = 0
+    for ref, got in zip(fp32_results, int8_results):
+        ref_spans, got_spans = spans(ref), spans(got)
+        tp += len(ref_spans & got_spans)
+        fp += len(got_spans - ref_spans)
+        fn += len(ref_spans - got_spans)
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    fp32_ms = 1000 * sum(fp32_times) / len(texts)
+    int8_ms = 1000 * sum(int8_times) / len(texts)
+    print(f"Documents:           {len(texts)}")
+    print(f"{'':<20} {'fp32':>10} {'int8':>10}")
+    print(f"{'Latency (ms/doc)':<20} {fp32_ms:>10.1f} {int8_ms:>10.1f}")
+    print(f"{'Model size (MB)':<20} {model_size_mb(fp32):>10.1f} {model_size_mb(int8):>10.1f}")
+    print(f"Speedup:             {fp32_ms / int8_ms:.2f}x")
+    print(f"Entity agreement:    P={precision:.3f} R={recall:.3f} F1={f1:.3f}")
+
+
+if __name__ == "__main__":
+    main()
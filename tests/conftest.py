@@ -0,0 +1,40 @@
+import hashlib
+
+import numpy as np
+import pytest
+import torch
+
+from modules import similarity
+
+
+class HashingEncoder:
+    """
+    Offline stand-in for SentenceTransformer: a bag of hashed words, so
+    documents sharing words get similar embeddings. Counts encoded texts.
+    """
+    dim = 64
+    max_seq_length = 128
+    tokenizer = None
+    encoded = 0
+
+    def __init__(self, name, device=None):
+        self.name = name
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, **kwargs):
+        HashingEncoder.encoded += len(texts)
+        vectors = np.full((len(texts), self.dim), 1e-3, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        return torch.from_numpy(vectors)
+
+
+@pytest.fixture
+def fake_encoder(monkeypatch):
+    """Make ResumeMatcher load HashingEncoder instead of downloading a model"""
+    monkeypatch.setattr(similarity, "SentenceTransformer", HashingEncoder)
+    HashingEncoder.encoded = 0
+    return HashingEncoder
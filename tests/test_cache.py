@@ -0,0 +1,58 @@
+import os
+
+from modules import cache as cache_module
+from modules import parser
+from modules.cache import ParseCache
+
+
+def test_evicts_least_recently_used_first(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(cache_module.time, "time", lambda: next(clock))
+    cache = ParseCache(str(tmp_path / "cache.sqlite"), max_bytes=10_000)
+    payload = os.urandom(4000)  # incompressible: ~4 kB per entry
+
+    cache.put("a", payload)
+    cache.put("b", payload)
+    assert cache.get("a") == payload  # a is now more recent than b
+    cache.put("c", payload)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == payload
+    assert cache.get("c") == payload
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ParseCache(path).put("key", {"text": "resume"})
+    assert ParseCache(path).get("key") == {"text": "resume"}
+
+
+def test_keys_separate_kind_file_type_and_content():
+    keys = {
+        parser._cache_key("text", b"same bytes", "pdf"),
+        parser._cache_key("parsed", b"same bytes", "pdf"),
+        parser._cache_key("text", b"same bytes", "docx"),
+        parser._cache_key("text", b"other bytes", "pdf"),
+    }
+    assert len(keys) == 4
+    assert parser._cache_key("text", b"same bytes", "pdf") == parser._cache_key("text", b"same bytes", "pdf")
+
+
+def test_parse_resume_reuses_cached_record_under_each_upload_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, "_parse_cache", ParseCache(str(tmp_path / "cache.sqlite")))
+    extracted = []
+
+    def fake_extract(data, file_type):
+        extracted.append(data)
+        return bytes(data).decode()
+
+    monkeypatch.setattr(parser, "_extract_text", fake_extract)
+    monkeypatch.setattr(parser.ner, "extract_entities_batch", lambda texts, batch_size=None: [{"entities": {}, "raw": []} for _ in texts])
+
+    first = parser.parse_resume(("first.pdf", b"Jane Doe\nSkills\nPython"))
+    second = parser.parse_resume(("second.pdf", b"Jane Doe\nSkills\nPython"))
+
+    assert len(extracted) == 1
+    assert first["metadata"]["filename"] == "first.pdf"
+    assert second["metadata"]["filename"] == "second.pdf"
+    assert second["skills"] == first["skills"] == ["Python"]
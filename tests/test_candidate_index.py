@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from modules.candidate_index import CandidateIndex
+from modules.similarity import ResumeMatcher
+
+RECORDS = [
+    {"name": "Ada", "filename": "ada.pdf", "skills": ["Python", "SQL"],
+     "text": "Python developer building Django REST APIs on PostgreSQL"},
+    {"name": "Bo", "filename": "bo.pdf", "skills": ["Java"],
+     "text": "Java Spring engineer writing microservices"},
+    {"name": "Cy", "filename": "cy.pdf", "skills": ["Python", "Machine Learning"],
+     "text": "Python machine learning engineer training PyTorch models"},
+    {"name": "Di", "filename": "di.pdf", "skills": [],
+     "text": "Frontend React engineer shipping TypeScript web apps"},
+]
+JD = "Python engineer for Django APIs and machine learning"
+
+
+def names(results):
+    return [r["name"] for r in results]
+
+
+def brute_force_tfidf(index, texts, jd):
+    """Cosine of smoothed-IDF weighted hashed term counts, computed from scratch"""
+    counts = index.vectorizer.transform([index.matcher.clean_text(t) for t in texts]).toarray()
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(texts)) / (1 + df)) + 1
+    docs = counts * idf
+    query = index.vectorizer.transform([index.matcher.clean_text(jd)]).toarray()[0] * idf
+    norms = np.linalg.norm(docs, axis=1) * np.linalg.norm(query)
+    return docs @ query / np.maximum(norms, 1e-12)
+
+
+def test_candidates_survive_reopening(tmp_path):
+    index = CandidateIndex(str(tmp_path), ResumeMatcher(method="tfidf"))
+    assert index.add(RECORDS) == 4
+    assert index.add(RECORDS[:2]) == 0  # already indexed, by text
+    before = index.query(JD, top_k=3)
+
+    reopened = CandidateIndex(str(tmp_path), ResumeMatcher(method="tfidf"))
+    assert len(reopened) == 4
+    assert reopened.query(JD, top_k=3) == before
+
+
+def test_interrupted_add_is_rolled_back(tmp_path):
+    index = CandidateIndex(str(tmp_path), ResumeMatcher(method="tfidf"))
+    index.add(RECORDS[:2])
+    # A crash after the arrays were appended, halfway through the metadata line
+    with open(index._path("tf_data"), "ab") as f:
+        f.write(np.ones(5, dtype=np.float32).tobytes())
+    with open(index._path("tf_indices"), "ab") as f:
+        f.write(np.arange(5, dtype=np.int32).tobytes())
+    with open(index._path("tf_indptr"), "ab") as f:
+        f.write(np.array([index._nnz + 5], dtype=np.int64).tobytes())
+    with open(index._path("meta.jsonl"), "a", encoding="utf-8") as f:
+        f.write('{"id": "half-writ')
+
+    reopened = CandidateIndex(str(tmp_path), ResumeMatcher(method="tfidf"))
+    assert len(reopened) == 2
+    assert reopened.add(RECORDS[2:]) == 2
+    again = CandidateIndex(str(tmp_path), ResumeMatcher(method="tfidf"))
+    assert names(again.query(JD, top_k=4)) == names(reopened.query(JD, top_k=4))
+    assert len(again) == 4
+
+
+def test_query_scores_equal_brute_force_cosine(tmp_path):
+    index = CandidateIndex(str(tmp_path), ResumeMatcher(method="tfidf"))
+    index.add(RECORDS[:2])
+    index.add(RECORDS[2:])  # document frequencies are updated incrementally
+    expected = brute_force_tfidf(index, [r["text"] for r in RECORDS], JD)
+
+    results = index.query(JD, top_k=4)
+    assert names(results) == [RECORDS[i]["name"] for i in np.argsort(-expected, kind="stable")]
+    by_name = {r["name"]: r["score"] for r in results}
+    for record, score in zip(RECORDS, expected):
+        assert by_name[record["name"]] == pytest.approx(score, abs=1e-4)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_compact_embeddings_return_the_float32_ranking(fake_encoder, tmp_path, dtype):
+    exact = CandidateIndex(str(tmp_path / "float32"), ResumeMatcher(method="hybrid", embedding_cache=False))
+    compact = CandidateIndex(
+        str(tmp_path / dtype), ResumeMatcher(method="hybrid", embedding_cache=False), embedding_dtype=dtype
+    )
+    for index in (exact, compact):
+        index.add(RECORDS)
+    ranked = [(r["id"], r["score"]) for r in exact.query(JD, top_k=2)]
+    assert [(r["id"], r["score"]) for r in compact.query(JD, top_k=2)] == ranked
+
+
+def test_filters(tmp_path):
+    index = CandidateIndex(str(tmp_path), ResumeMatcher(method="tfidf"))
+    index.add(RECORDS[:3])
+
+    assert sorted(names(index.query(JD, filters={"skills": "Python"}))) == ["Ada", "Cy"]
+    assert sorted(names(index.query(JD, filters={"skills": ["Python"]}))) == ["Ada", "Cy"]
+    assert sorted(names(index.query(JD, filters={"skills": {"Java", "SQL"}}))) == ["Ada", "Bo"]
+    assert names(index.query(JD, filters={"skills": "Python", "filename": "cy.pdf"})) == ["Cy"]
+    assert names(index.query(JD, filters={"skills": lambda skills: not skills})) == []
+
+    # Columns built by earlier queries are extended by add
+    index.add(RECORDS[3:])
+    assert names(index.query(JD, filters={"skills": lambda skills: not skills})) == ["Di"]
+    assert sorted(names(index.query(JD, filters={"skills": "Python"}))) == ["Ada", "Cy"]
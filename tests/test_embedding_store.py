@@ -0,0 +1,67 @@
+import multiprocessing
+
+import numpy as np
+
+from modules.embedding_store import EmbeddingStore
+
+DIM = 8
+
+
+def vectors_for(keys):
+    return np.array([[sum(map(ord, key)) + i for i in range(DIM)] for key in keys], dtype=np.float32)
+
+
+def append_keys(directory, keys):
+    EmbeddingStore("model", DIM, directory=directory).add(keys, vectors_for(keys))
+
+
+def test_vectors_survive_reopening(tmp_path):
+    store = EmbeddingStore("model", DIM, directory=str(tmp_path))
+    store.add(["a", "b"], vectors_for(["a", "b"]))
+    store.add(["b", "c"], vectors_for(["b", "c"]))  # b is not stored twice
+
+    reopened = EmbeddingStore("model", DIM, directory=str(tmp_path))
+    assert len(reopened) == 3
+    found = reopened.get_many(["c", "missing", "a"])
+    assert found[1] is None
+    np.testing.assert_array_equal(np.vstack([found[0], found[2]]), vectors_for(["c", "a"]))
+
+
+def test_picks_up_rows_appended_by_other_processes(tmp_path):
+    directory = str(tmp_path)
+    store = EmbeddingStore("model", DIM, directory=directory)
+    store.add(["parent"], vectors_for(["parent"]))
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=append_keys, args=(directory, [f"w{w}-{i}" for i in range(50)]))
+        for w in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    # The parent's instance still appends after the workers' rows, not over them
+    store.add(["parent-2"], vectors_for(["parent-2"]))
+    keys = ["parent", "parent-2"] + [f"w{w}-{i}" for w in range(3) for i in range(50)]
+    found = store.get_many(keys)
+    np.testing.assert_array_equal(np.vstack(found), vectors_for(keys))
+    assert len(EmbeddingStore("model", DIM, directory=directory)) == len(keys)
+
+
+def test_half_written_tail_is_dropped(tmp_path):
+    store = EmbeddingStore("model", DIM, directory=str(tmp_path))
+    store.add(["a", "b"], vectors_for(["a", "b"]))
+    # A writer crashed after its vectors and part of an index line
+    with open(store.vectors_path, "ab") as f:
+        f.write(vectors_for(["c"]).tobytes())
+    with open(store.index_path, "a") as f:
+        f.write("c-partial")
+
+    reopened = EmbeddingStore("model", DIM, directory=str(tmp_path))
+    assert len(reopened) == 2
+    reopened.add(["d"], vectors_for(["d"]))
+    found = EmbeddingStore("model", DIM, directory=str(tmp_path)).get_many(["a", "b", "d"])
+    np.testing.assert_array_equal(np.vstack(found), vectors_for(["a", "b", "d"]))
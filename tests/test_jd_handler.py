@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+
+from modules.jd_handler import load_jd_bundle
+from modules.similarity import ResumeMatcher
+
+JDS = {
+    "Backend Developer": "Python developer building Django REST APIs on PostgreSQL",
+    "Frontend Developer": "React and TypeScript engineer for responsive web apps",
+}
+
+
+def write_jds(path, jds):
+    path.write_text(json.dumps(jds), encoding="utf-8")
+
+
+def test_bundle_is_reused_until_the_json_changes(fake_encoder, tmp_path):
+    json_path, bundle_dir = tmp_path / "jds.json", str(tmp_path / "bundle")
+    write_jds(json_path, JDS)
+    matcher = ResumeMatcher(method="hybrid", embedding_cache=False)
+
+    built = load_jd_bundle(str(json_path), bundle_dir, matcher)
+    encoded = fake_encoder.encoded
+    reused = load_jd_bundle(str(json_path), bundle_dir, matcher)
+    assert fake_encoder.encoded == encoded
+    assert reused.roles == built.roles == list(JDS)
+    np.testing.assert_array_equal(reused.embeddings, built.embeddings)
+
+    write_jds(json_path, {**JDS, "Data Engineer": "Spark and Airflow pipelines on AWS"})
+    assert load_jd_bundle(str(json_path), bundle_dir) is None  # stale, and nothing to rebuild with
+    rebuilt = load_jd_bundle(str(json_path), bundle_dir, matcher)
+    assert rebuilt.roles == list(JDS) + ["Data Engineer"]
+    assert rebuilt.embeddings.shape[0] == 3
+
+
+def test_bundle_embeddings_stand_in_for_encoding(fake_encoder, tmp_path):
+    json_path = tmp_path / "jds.json"
+    write_jds(json_path, JDS)
+    matcher = ResumeMatcher(method="hybrid", embedding_cache=False)
+    matcher.attach_bundle(load_jd_bundle(str(json_path), str(tmp_path / "bundle"), matcher))
+    resumes = ["Django REST APIs in Python", "React dashboards"]
+
+    encoded = fake_encoder.encoded
+    scores = matcher.get_similarity_score(JDS["Backend Developer"], resumes)
+    assert fake_encoder.encoded == encoded + len(resumes)  # the JD itself is not encoded
+    fresh = ResumeMatcher(method="hybrid", embedding_cache=False)
+    assert scores == fresh.get_similarity_score(JDS["Backend Developer"], resumes)
+
+
+ROLES = {
+    "Backend Developer": "Python developer building Django REST APIs on PostgreSQL",
+    "Frontend Developer": "React and TypeScript engineer for responsive web apps",
+    "Data Engineer": "Spark and Airflow pipelines on AWS with Python and SQL",
+    "Mobile Developer": "Kotlin and Swift developer shipping Android and iOS apps",
+    "DevOps Engineer": "Kubernetes, Docker and Terraform on AWS with CI pipelines",
+    "ML Engineer": "Python machine learning engineer training PyTorch models",
+}
+
+
+def test_match_all_roles_returns_exact_scores_for_the_best_roles(fake_encoder, tmp_path):
+    json_path = tmp_path / "jds.json"
+    write_jds(json_path, ROLES)
+    resume = "Python engineer: Django REST APIs, PostgreSQL, Airflow and SQL pipelines on AWS"
+
+    for method in ("tfidf", "hybrid", "embedding"):
+        matcher = ResumeMatcher(method=method, embedding_cache=False)
+        matcher.attach_bundle(load_jd_bundle(str(json_path), str(tmp_path / method), matcher))
+        exact = {
+            role: matcher.get_similarity_score(jd, [resume])[0][1]
+            for role, jd in ROLES.items()
+        }
+        everything = matcher.match_all_roles(resume)
+        assert dict(everything) == exact
+        best = matcher.match_all_roles(resume, top_k=2)
+        assert best == everything[:2]
@@ -0,0 +1,55 @@
+from modules import parser
+from modules.cache import ParseCache
+
+
+class FlakyPipeline:
+    """NER pipeline stand-in that fails any call containing a 'corrupt' window"""
+    tokenizer = None  # no offsets: every document is a single window
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, chunks, batch_size=None):
+        self.calls += 1
+        if any("corrupt" in chunk for chunk in chunks):
+            raise RuntimeError("bad input")
+        return [[{"entity_group": "PER", "word": chunk.split()[0], "start": 0, "end": 4, "score": 0.9}] for chunk in chunks]
+
+
+def use_pipeline(monkeypatch, pipeline):
+    monkeypatch.setattr(parser.ner, "ner_pipeline", pipeline)
+    monkeypatch.setattr(parser.ner, "_model_loaded", True)
+
+
+def test_failed_batch_is_retried_per_document(monkeypatch):
+    use_pipeline(monkeypatch, FlakyPipeline())
+    results = parser.ner.extract_entities_batch(["Jane Doe", "corrupt file", "John Roe"])
+
+    assert [r["entities"] for r in results] == [{"PER": ["Jane"]}, {}, {"PER": ["John"]}]
+    assert [bool(r.get("failed")) for r in results] == [False, True, False]
+
+
+def test_documents_whose_ner_failed_are_not_cached(tmp_path, monkeypatch):
+    pipeline = FlakyPipeline()
+    use_pipeline(monkeypatch, pipeline)
+    monkeypatch.setattr(parser, "_parse_cache", ParseCache(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(parser, "_extract_text", lambda data, file_type: bytes(data).decode())
+    files = [("good.pdf", b"Jane Doe\nSkills\nPython"), ("bad.pdf", b"corrupt file\nSkills\nJava")]
+
+    first = parser.parse_resumes(files)
+    assert first[1]["global_entities"]["failed"]
+    calls = pipeline.calls
+
+    second = parser.parse_resumes(files)
+    assert pipeline.calls == calls + 1  # only the failed document is run again
+    assert second[0]["global_entities"] == first[0]["global_entities"]
+
+    calls = pipeline.calls
+    parser.parse_resume(files[1])
+    assert pipeline.calls == calls + 1
+
+
+def test_skills_are_found_under_upper_case_headings_and_without_headings():
+    upper = "JANE DOE\nSKILLS\nPython, SQL\nWORK EXPERIENCE\nBuilt Java services\nEDUCATION\nB.Tech"
+    assert parser.extract_skills(upper) == ["Java", "Python", "SQL"]
+    assert parser.extract_skills("Jane Doe\nPython developer using SQL and React") == ["Python", "React", "SQL"]
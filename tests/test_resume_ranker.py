@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from modules import embedding_store
+from modules.resume_ranker import ResumeRanker, _extract_metadata
+from modules.skill_matcher import filter_bitsets, skill_matcher
+
+JD = "Python Django developer building REST APIs on PostgreSQL"
+
+
+def parsed_resumes(n):
+    return [
+        {
+            "metadata": {
+                "text": f"Candidate {i}\nSkills\nPython {'Django PostgreSQL' if i % 3 else 'Java'} REST\n"
+                        f"Experience\nBuilt {i} APIs",
+                "filename": f"candidate-{i}.pdf"
+            },
+            "skills": None
+        }
+        for i in range(n)
+    ]
+
+
+def scores_by_file(rows):
+    return {row["Filename"]: row["Score (%)"] for row in rows}
+
+
+@pytest.fixture
+def ranker(fake_encoder, tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "CACHE_DIR", str(tmp_path))
+    return ResumeRanker()
+
+
+def test_streamed_scores_end_equal_to_batch_ranking(ranker):
+    parsed = parsed_resumes(12)
+    batches = iter([parsed[:3], parsed[3:9], parsed[9:]])
+    updates = list(ranker.iter_rank_parsed(batches, JD, total=len(parsed), top_k=4, warmup=4))
+
+    assert [u["rescored"] for u in updates] == [False] * 3 + [True]
+    expected = ranker.rank_parsed(parsed, JD)
+    final = updates[-1]
+    assert scores_by_file(final["results"]) == dict(zip(expected["Filename"], expected["Score (%)"]))
+    assert [row["Score (%)"] for row in final["top"]] == list(expected["Score (%)"][:4])
+
+
+def test_cascade_table_reports_stages(ranker):
+    ranker.cascade_top_k = 2
+    ranker.cascade_margin = 1
+    ranker.cascade_measure_recall = True
+    df = ranker.rank_parsed(parsed_resumes(8), JD)
+
+    assert list(df["Stage"]) == ["re-ranked"] * 3 + ["pre-filter"] * 5
+    report = df.attrs["cascade"]
+    assert {"prefilter", "rerank", "total"} <= set(report["timings"])
+    assert report["recall_at_k"] is not None
+
+
+def test_streaming_applies_the_cascade_in_the_final_update(ranker):
+    ranker.cascade_top_k = 2
+    ranker.cascade_margin = 1
+    parsed = parsed_resumes(9)
+    updates = list(ranker.iter_rank_parsed(iter([parsed[:5], parsed[5:]]), JD, total=9, top_k=3, warmup=4))
+
+    final = updates[-1]
+    assert final["rescored"] and "cascade" in final
+    expected = ranker.rank_parsed(parsed, JD)
+    assert [row["Filename"] for row in final["results"]] == list(expected["Filename"])
+    assert [row["Stage"] for row in final["top"]] == ["re-ranked"] * 3
+    assert ranker.to_frame(final["results"])["Score (%)"].tolist() == expected["Score (%)"].tolist()
+
+
+def test_skill_filters_keep_resumes_with_upper_case_headings():
+    records = [
+        _extract_metadata("JANE DOE\nSKILLS\nPython, SQL\nEDUCATION\nB.Tech", "jane.pdf"),
+        _extract_metadata("John Roe\nJava developer", "john.pdf"),
+    ]
+    assert records[0]["skills"] == ["Python", "SQL"]
+    keep = filter_bitsets(
+        np.vstack([r["skill_bits"] for r in records]),
+        required=skill_matcher.bitset(["Python"])
+    )
+    assert keep.tolist() == [True, False]
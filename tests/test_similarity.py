@@ -0,0 +1,87 @@
+import numpy as np
+
+from modules.similarity import ResumeMatcher
+
+JD = "Python developer building Django REST APIs on PostgreSQL"
+RESUME = "Built Django REST APIs in Python backed by PostgreSQL"
+POOL = [RESUME, "Go engineer writing gRPC microservices", "Python data analyst using pandas"]
+
+
+def test_tfidf_scores_do_not_depend_on_earlier_pools():
+    scores = []
+    for first_pool in (["Java Spring developer", "Python data analyst"], ["Frontend React engineer"]):
+        matcher = ResumeMatcher(method="tfidf")
+        matcher.get_similarity_score(JD, first_pool)
+        scores.append(matcher.get_similarity_score(JD, POOL))
+    assert scores[0] == scores[1] == ResumeMatcher(method="tfidf").get_similarity_score(JD, POOL)
+
+
+def test_jd_embedding_is_cached_across_pools(fake_encoder, tmp_path):
+    matcher = ResumeMatcher(method="hybrid", embedding_cache_dir=str(tmp_path))
+    first = matcher.get_similarity_score(JD, POOL)
+    encoded = fake_encoder.encoded
+    matcher.get_similarity_score(JD, POOL[:1])
+    # Only the resume is looked up again; the JD is neither re-encoded nor re-cleaned
+    assert fake_encoder.encoded == encoded
+    fresh = ResumeMatcher(method="hybrid", embedding_cache=False).get_similarity_score(JD, POOL)
+    assert first == fresh
+
+
+def test_cascade_with_full_shortlist_matches_full_reranking(fake_encoder):
+    matcher = ResumeMatcher(method="hybrid", embedding_cache=False)
+    pool = POOL + ["Django developer", "PostgreSQL DBA", "Python scripting for ops"]
+    full = matcher.cascade_rank(JD, pool, top_k=3, margin=len(pool), measure_recall=True)
+    assert full["recall_at_k"] == 1.0
+    assert sorted(full["shortlist"]) == list(range(len(pool)))
+
+    cascade = matcher.cascade_rank(JD, pool, top_k=2, margin=1)
+    assert len(cascade["shortlist"]) == 3
+    assert [i for i, _ in cascade["scores"]][:3] == cascade["shortlist"]
+    assert sorted(i for i, _ in cascade["scores"]) == list(range(len(pool)))
+    # A prebuilt context is scored the same as the raw JD
+    context = matcher.build_context(JD, pool)
+    assert matcher.cascade_rank(context, pool, top_k=2, margin=1)["scores"] == cascade["scores"]
+
+
+def test_match_skills_exact_without_embeddings():
+    matcher = ResumeMatcher(method="tfidf")
+    jd_phrases = matcher.skill_phrases("Python and Docker; Kubernetes a plus. Python daily.")
+    assert jd_phrases == ["python", "docker", "kubernetes"]
+
+    result = matcher.match_skills(jd_phrases + ["teamwork"], ["Python", "java"])
+    assert result["jd_skills"] == ["python", "docker", "kubernetes"]
+    assert result["matched"] == [("python", "python", 1.0)]
+    assert result["missing"] == ["docker", "kubernetes"]
+    assert result["coverage"] == 1 / 3
+
+
+def test_match_skills_with_embeddings_keeps_jd_order(fake_encoder):
+    matcher = ResumeMatcher(method="embedding", embedding_cache=False)
+    result = matcher.match_skills(["kubernetes", "python", "docker"], ["python", "sql"])
+    assert result["jd_skills"] == ["kubernetes", "python", "docker"]
+    assert [m[:2] for m in result["matched"]] == [("python", "python")]
+    assert result["missing"] == ["kubernetes", "docker"]
+
+
+def test_score_matrix_shares_one_tfidf_fit():
+    matcher = ResumeMatcher(method="tfidf")
+    jds = [JD, "Go engineer for gRPC microservices", "Data analyst with pandas and SQL"]
+    matrix = matcher.score_matrix(jds, POOL)
+
+    vectorizer, jd_rows = matcher._fit_tfidf([matcher.clean_text(jd) for jd in jds], POOL)
+    expected = (jd_rows @ matcher._tfidf_vectors(vectorizer, POOL).T).toarray()
+    np.testing.assert_allclose(matrix, expected, atol=1e-4)
+
+
+def test_score_matrix_embedding_rows_equal_per_jd_scores(fake_encoder):
+    matcher = ResumeMatcher(method="embedding", embedding_cache=False)
+    jds = [JD, "Go engineer for gRPC microservices"]
+    matrix = matcher.score_matrix(jds, POOL)
+    for row, jd in zip(matrix, jds):
+        np.testing.assert_allclose(row, [s for _, s in matcher.get_similarity_score(jd, POOL)], atol=1e-4)
+
+
+def test_encoding_nothing_gives_an_empty_matrix(fake_encoder, tmp_path):
+    for store in (False, True):
+        matcher = ResumeMatcher(method="embedding", embedding_cache=store, embedding_cache_dir=str(tmp_path))
+        assert matcher._encode([]).shape == (0, fake_encoder.dim)
@@ -0,0 +1,66 @@
+import re
+import random
+
+from modules.text_constants import SKILL_KEYWORDS, SKILL_CATEGORIES
+from modules.skill_matcher import SkillMatcher
+
+
+def baseline_skills(text):
+    """The per-pattern loop extract_skills used before SkillMatcher"""
+    return {
+        skill for skill, patterns in SKILL_KEYWORDS.items()
+        for pattern in patterns
+        if re.search(r"\b" + pattern + r"\b", text, re.IGNORECASE)
+    }
+
+
+def baseline_categories(skill):
+    return {
+        category for category, patterns in SKILL_CATEGORIES.items()
+        for pattern in patterns
+        if re.search(r"\b" + pattern + r"\b", skill.lower())
+    }
+
+
+def test_shared_start_offset_reports_every_skill():
+    matcher = SkillMatcher()
+    text = "Experienced in C++11 and Java"
+    assert matcher.find_skills(text) == baseline_skills(text) == {"C", "C++", "Java"}
+
+
+def test_matches_baseline_on_random_texts():
+    matcher = SkillMatcher()
+    vocabulary = [
+        "python", "Java", "javascript", "js", "C++", "c", "C#", "SQL", "html5", "css",
+        "react", "node", "node.js", "nodejs", "pygame", "streamlit", "git", "github",
+        "machine learning", "ML", "data structures", "web development", "deepface",
+        "C++11", "and", "with", "built", "in", "-", ",", "/", "(", ")"
+    ]
+    rng = random.Random(0)
+    for _ in range(500):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(1, 20))]
+        text = rng.choice([" ", "", ", "]).join(words)
+        assert matcher.find_skills(text) == baseline_skills(text), text
+
+
+def test_categories_match_baseline():
+    matcher = SkillMatcher()
+    for skill in SKILL_KEYWORDS:
+        assert matcher.categories_for(skill) == baseline_categories(skill), skill
+
+
+def test_patterns_without_a_fixed_first_character():
+    keywords = {
+        "Python": ["(?:py|ja)thon", "python3?"],
+        "X-ray": ["x?ray", "\\bxr"],
+        "Go": ["go(?:lang)?", "g"],
+        "Kotlin": ["kotlin"]
+    }
+    matcher = SkillMatcher(skill_keywords=keywords, skill_categories={})
+    for text in ["Jathon and PYTHON3", "ray xray XR", "golang, g", "KOTLIN", "Kelvin Kotlin", "nothing"]:
+        expected = {
+            skill for skill, patterns in keywords.items()
+            for pattern in patterns
+            if re.search(r"\b" + pattern + r"\b", text, re.IGNORECASE)
+        }
+        assert matcher.find_skills(text) == expected, text